@@ -1,6 +1,8 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR
 from django.contrib.auth.admin import UserAdmin
 from apps.accounts.models import User
+from apps.accounts.search import rank_matches
 
 
 @admin.register(User)
@@ -26,3 +28,10 @@ class CustomUserAdmin(UserAdmin):
     )
 
     readonly_fields = ('otp_created_at', 'date_joined', 'last_login')
+
+    def get_search_results(self, request, queryset, search_term):
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        # Prefix-first ranking while searching, unless a column sort was picked.
+        if search_term and ORDER_VAR not in request.GET:
+            queryset = rank_matches(queryset, search_term).order_by('match_rank', *queryset.query.order_by)
+        return queryset, may_have_duplicates
@@ -0,0 +1,57 @@
+"""
+Bulk user creation, shared by the import_users command and the batch
+registration endpoint.
+"""
+import django
+from django.contrib.auth.hashers import make_password
+from apps.accounts.models import User
+
+
+def hash_passwords(passwords, executor=None):
+    """
+    Hash plaintext passwords (None gives an unusable password), optionally
+    spread over an executor. The stock hashers release the GIL while hashing,
+    so a ThreadPoolExecutor already scales across cores; a ProcessPoolExecutor
+    created with initializer=init_hashing_worker works for any hasher.
+    """
+    if executor is None:
+        return [make_password(password) for password in passwords]
+    return list(executor.map(make_password, passwords, chunksize=max(1, len(passwords) // 32)))
+
+
+def init_hashing_worker():
+    django.setup()
+
+
+def build_user(email, password_hash, first_name='', last_name='', is_email_verified=False):
+    return User(
+        email=User.objects.normalize_email(email),
+        password=password_hash,
+        first_name=first_name or '',
+        last_name=last_name or '',
+        is_email_verified=is_email_verified,
+    )
+
+
+def insert_users(users, batch_size=1000):
+    """
+    Insert users, skipping emails that already exist or repeat within the
+    batch. Returns {email: pk} for the rows this call created: conflicting
+    concurrent inserts are ignored by the database and told apart afterwards
+    by their password hash, which is salted and so unique to this insert.
+    """
+    existing = set(User.objects.filter(email__in=[u.email for u in users]).values_list('email', flat=True))
+    fresh = {}
+    for user in users:
+        if user.email not in existing and user.email not in fresh:
+            fresh[user.email] = user
+    if not fresh:
+        return {}
+
+    User.objects.bulk_create(fresh.values(), batch_size=batch_size, ignore_conflicts=True)
+
+    return {
+        email: pk
+        for email, pk, password in User.objects.filter(email__in=fresh).values_list('email', 'pk', 'password')
+        if fresh[email].password == password
+    }
@@ -0,0 +1,27 @@
+import sys
+from django.core.management.base import BaseCommand
+from apps.accounts.export import CONTENT_TYPES, export_users
+
+
+class Command(BaseCommand):
+    help = 'Stream all users (no password hashes or OTP data) as CSV or NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(CONTENT_TYPES), default='csv', help='Output format')
+        parser.add_argument('--gzip', action='store_true', help='Gzip the output')
+        parser.add_argument('--output', default='-', help="Output file, or '-' for stdout")
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per database round trip')
+
+    def handle(self, *args, **options):
+        chunks = export_users(options['format'], options['gzip'], options['chunk_size'])
+
+        if options['output'] == '-':
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+
+        with open(options['output'], 'wb') as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f'Exported users to {options["output"]}'))
@@ -0,0 +1,126 @@
+import csv
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.contrib.auth.hashers import identify_hasher
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from apps.accounts.bulk import build_user, hash_passwords, init_hashing_worker, insert_users
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Import users from CSV or NDJSON. Columns: email, first_name, last_name, is_email_verified, '
+        'and either password (plaintext) or password_hash (Django hash format). Existing emails are skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or '-' for stdin")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Input format (default: from the file extension)')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per bulk insert')
+        parser.add_argument('--workers', type=int, default=1, help='Processes for hashing plaintext passwords')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        if path == '-' and not options['format']:
+            raise CommandError('--format is required when reading from stdin')
+
+        handle = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        executor = None
+        if options['workers'] > 1:
+            executor = ProcessPoolExecutor(options['workers'], initializer=init_hashing_worker)
+
+        self.processed = self.created = self.skipped = self.invalid = 0
+        self.started = time.perf_counter()
+        try:
+            chunk = []
+            for line_number, record in self.read_records(handle, input_format):
+                chunk.append((line_number, record))
+                if len(chunk) >= options['chunk_size']:
+                    self.import_chunk(chunk, executor, options['chunk_size'])
+                    chunk = []
+            if chunk:
+                self.import_chunk(chunk, executor, options['chunk_size'])
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            if handle is not sys.stdin:
+                handle.close()
+
+        self.stdout.write(self.style.SUCCESS(f'Done: {self.progress()}'))
+
+    def read_records(self, handle, input_format):
+        if input_format == 'csv':
+            for line_number, row in enumerate(csv.DictReader(handle), start=2):
+                yield line_number, row
+            return
+
+        for line_number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                self.reject(line_number, f'invalid JSON: {e}')
+                continue
+            if not isinstance(record, dict):
+                self.reject(line_number, f'expected a JSON object, got {type(record).__name__}')
+                continue
+            yield line_number, record
+
+    def reject(self, line_number, reason):
+        self.invalid += 1
+        self.processed += 1
+        self.stderr.write(f'Line {line_number}: {reason}')
+
+    def import_chunk(self, chunk, executor, chunk_size):
+        valid = []
+        for line_number, record in chunk:
+            email = (record.get('email') or '').strip()
+            password_hash = record.get('password_hash') or None
+            try:
+                validate_email(email)
+                if password_hash:
+                    identify_hasher(password_hash)
+            except ValidationError:
+                self.reject(line_number, f'invalid email {email!r}')
+                continue
+            except ValueError:
+                self.reject(line_number, 'password_hash is not in a recognised Django hash format')
+                continue
+            valid.append((email, password_hash, record))
+
+        to_hash = [i for i, (_, password_hash, _) in enumerate(valid) if not password_hash]
+        hashed = hash_passwords([valid[i][2].get('password') or None for i in to_hash], executor)
+        hashes = [password_hash for _, password_hash, _ in valid]
+        for i, password_hash in zip(to_hash, hashed):
+            hashes[i] = password_hash
+
+        users = [
+            build_user(
+                email, password_hash,
+                first_name=record.get('first_name'),
+                last_name=record.get('last_name'),
+                is_email_verified=str(record.get('is_email_verified', '')).strip().lower() in TRUE_VALUES,
+            )
+            for (email, _, record), password_hash in zip(valid, hashes)
+        ]
+        created = insert_users(users, batch_size=chunk_size)
+
+        self.processed += len(valid)
+        self.created += len(created)
+        self.skipped += len(valid) - len(created)
+        self.stdout.write(self.progress())
+
+    def progress(self):
+        elapsed = time.perf_counter() - self.started
+        rate = self.processed / elapsed if elapsed else 0
+        return (
+            f'{self.processed:,} rows: {self.created:,} created, {self.skipped:,} skipped, '
+            f'{self.invalid:,} invalid ({rate:,.0f} rows/s)'
+        )
@@ -49,6 +49,13 @@ class User(AbstractUser, TimeStampedModel):
         verbose_name = 'User'
         verbose_name_plural = 'Users'
         ordering = ['-date_joined']
+        indexes = [
+            # Default ordering and the admin's filters; name/email search uses
+            # trigram indexes created by migration 0004 on PostgreSQL.
+            models.Index(fields=['-date_joined'], name='accounts_user_joined_idx'),
+            models.Index(fields=['is_active', '-date_joined'], name='accounts_user_active_idx'),
+            models.Index(fields=['is_email_verified', '-date_joined'], name='accounts_user_verified_idx'),
+        ]
 
     def __str__(self):
         return self.email
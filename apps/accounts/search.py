@@ -0,0 +1,57 @@
+"""
+User search for the admin and the staff search API.
+
+Terms match email, first and last name case-insensitively. On PostgreSQL
+those comparisons (UPPER(col::text) LIKE ...) are served by pg_trgm GIN
+indexes created in migration 0004, so neither prefix nor substring matches
+scan the table. Results are ranked prefix-first: exact email, then
+prefixes, then substrings.
+"""
+from django.db.models import Case, IntegerField, Q, Value, When
+
+SEARCH_FIELDS = ('email', 'first_name', 'last_name')
+
+
+def _any_field(term, lookup):
+    condition = Q()
+    for field in SEARCH_FIELDS:
+        condition |= Q(**{f'{field}__{lookup}': term})
+    return condition
+
+
+def rank_matches(queryset, q):
+    """Annotate match_rank: 0 exact email, 1 prefix of any field, 2 substring."""
+    terms = q.split()
+    if not terms:
+        return queryset.annotate(match_rank=Value(2, output_field=IntegerField()))
+
+    return queryset.annotate(match_rank=Case(
+        When(email__iexact=q.strip(), then=Value(0)),
+        When(_any_field(terms[0], 'istartswith'), then=Value(1)),
+        default=Value(2),
+        output_field=IntegerField(),
+    ))
+
+
+def search_users(queryset, q, limit):
+    """
+    Returns up to limit users matching every term, prefix matches first.
+    Prefix matches are fetched first and substring matches only fill the
+    remainder, so the common autocomplete case stops after the prefix query.
+    """
+    terms = q.split()
+    if not terms:
+        return []
+
+    prefix = queryset
+    for term in terms:
+        prefix = prefix.filter(_any_field(term, 'istartswith'))
+    results = list(rank_matches(prefix, q).order_by('match_rank', 'email')[:limit])
+
+    if len(results) < limit:
+        contains = queryset.exclude(pk__in=[user.pk for user in results])
+        for term in terms:
+            contains = contains.filter(_any_field(term, 'icontains'))
+        results += list(contains.order_by('email')[:limit - len(results)])
+
+    return results
@@ -43,16 +43,32 @@ class UserSerializer(serializers.ModelSerializer):
         validated_data.pop('password_confirm', None)
         password = validated_data.pop('password', None)
 
+        changed = []
         for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+            if getattr(instance, attr) != value:
+                setattr(instance, attr, value)
+                changed.append(attr)
 
         if password:
             instance.set_password(password)
+            changed.append('password')
 
-        instance.save()
+        # Write only what changed; an unchanged submission issues no UPDATE.
+        if changed:
+            instance.save(update_fields=changed + ['updated_at'])
         return instance
 
 
+class BulkRegisterUserSerializer(UserSerializer):
+    """
+    UserSerializer validation without the per-item email uniqueness query;
+    existing and repeated emails are resolved by the batched insert instead.
+    """
+
+    class Meta(UserSerializer.Meta):
+        extra_kwargs = {'email': {'validators': []}}
+
+
 class OTPSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
@@ -1,8 +1,20 @@
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from apps.accounts.models import User
+from apps.core import redis_keys
+from apps.core.models import OutboxMessage
+from apps.core.outbox import dispatch_batch
+from apps.core.redis_client import get_redis
 from unittest.mock import patch
 
 
@@ -48,19 +60,270 @@ class OTPAuthenticationTestCase(APITestCase):
         response = self.client.get(self.audit_logs_url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
-    @patch('apps.core.tasks.send_otp_email.delay')
-    @patch('apps.core.tasks.write_audit_log.delay')
-    def test_otp_request_calls_celery_tasks(self, mock_write_audit_log, mock_send_otp_email):
-        """Test that OTP request calls the correct Celery tasks."""
+    @patch('apps.core.tasks.send_otp_email.apply_async')
+    @patch('apps.core.middleware.get_audit_spool')
+    def test_otp_request_calls_celery_tasks(self, mock_get_audit_spool, mock_send_otp_email):
+        """Test that OTP request writes an outbox row that the dispatcher hands to Celery."""
         data = {'email': self.test_email}
         response = self.client.post(self.otp_request_url, data, format='json')
 
         self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
 
+        mock_send_otp_email.assert_not_called()
+        mock_submit = mock_get_audit_spool.return_value.submit
+        mock_submit.assert_called_once()
+
+        outbox = OutboxMessage.objects.get(kind=OutboxMessage.KIND_OTP_EMAIL)
+        self.assertEqual(outbox.payload['email'], self.test_email)
+
+        dispatch_batch()
         mock_send_otp_email.assert_called_once()
-        mock_write_audit_log.assert_called_once()
+        self.assertNotIn('otp', outbox.payload)
+        self.assertEqual(mock_send_otp_email.call_args[0][0], (self.test_email,))
+        self.assertIn('expires', mock_send_otp_email.call_args.kwargs)
+        audit_event = mock_submit.call_args[0][0]
+        self.assertEqual(audit_event['event'], 'OTP_REQUESTED')
+        self.assertEqual(audit_event['email'], self.test_email)
+        self.assertEqual(audit_event['meta']['status_code'], status.HTTP_202_ACCEPTED)
+
+
+class UserProfileConditionalTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('profile@example.com', 'password', first_name='Ada')
+        self.client.force_authenticate(self.user)
+        self.url = reverse('auth:profile')
+
+    def test_unchanged_profile_returns_304(self):
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_stale_if_match_is_rejected(self):
+        """Test that an update based on an old version fails with 412."""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.patch(self.url, {'first_name': 'Grace'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        response = self.client.patch(self.url, {'first_name': 'Lin'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Grace')
+
+
+class UserSearchTestCase(APITestCase):
+
+    def setUp(self):
+        staff = User.objects.create_user('staff@example.com', 'password', is_staff=True)
+        self.client.force_authenticate(staff)
+        User.objects.create_user('mary.ann@example.com', 'password', first_name='Mary')
+        User.objects.create_user('ann@example.com', 'password', first_name='Ann')
+        User.objects.create_user('joanne@example.com', 'password', first_name='Joanne', is_active=False)
+        self.url = reverse('auth:user_search')
+
+    def test_prefix_matches_come_first(self):
+        response = self.client.get(self.url, {'q': 'ann'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [u['email'] for u in response.data],
+            ['ann@example.com', 'joanne@example.com', 'mary.ann@example.com']
+        )
+
+    def test_filters_and_staff_only(self):
+        response = self.client.get(self.url, {'q': 'ann', 'is_active': 'false'})
+        self.assertEqual([u['email'] for u in response.data], ['joanne@example.com'])
+
+        self.client.force_authenticate(User.objects.get(email='ann@example.com'))
+        self.assertEqual(self.client.get(self.url, {'q': 'ann'}).status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportUsersTestCase(TestCase):
+
+    def test_import_csv(self):
+        """Test plaintext and pre-hashed rows are imported and duplicates, existing and invalid rows skipped."""
+        User.objects.create_user('existing@example.com', 'password')
+        prehashed = make_password('secret123')
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write(
+                'email,first_name,password,password_hash,is_email_verified\n'
+                'new@example.com,New,plain-password,,true\n'
+                f'hashed@example.com,Hashed,,{prehashed},false\n'
+                'existing@example.com,Old,plain-password,,false\n'
+                'new@example.com,Again,plain-password,,false\n'
+                'not-an-email,Bad,plain-password,,false\n'
+            )
+        self.addCleanup(os.remove, handle.name)
+
+        out = StringIO()
+        call_command('import_users', handle.name, '--chunk-size', '2', stdout=out, stderr=StringIO())
+
+        self.assertIn('5 rows: 2 created, 2 skipped, 1 invalid', out.getvalue())
+        self.assertTrue(User.objects.get(email='new@example.com').check_password('plain-password'))
+        self.assertTrue(User.objects.get(email='new@example.com').is_email_verified)
+        self.assertTrue(User.objects.get(email='hashed@example.com').check_password('secret123'))
+
+    def test_import_ndjson_rejects_non_object_lines(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as handle:
+            handle.write('[]\n"x"\n42\n{not json\n{"email": "json@example.com", "password": "pw"}\n')
+        self.addCleanup(os.remove, handle.name)
+
+        out = StringIO()
+        call_command('import_users', handle.name, stdout=out, stderr=StringIO())
+
+        self.assertIn('5 rows: 1 created, 0 skipped, 4 invalid', out.getvalue())
+        self.assertTrue(User.objects.filter(email='json@example.com').exists())
+
+
+class UserExportTestCase(APITestCase):
+
+    def setUp(self):
+        staff = User.objects.create_user('staff@example.com', 'password', is_staff=True)
+        self.client.force_authenticate(staff)
+        self.url = reverse('auth:user_export')
+
+    def test_ndjson_gzip_export_excludes_secrets(self):
+        response = self.client.get(self.url, {'output': 'ndjson', 'gzip': '1'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        record = json.loads(lines[0])
+        self.assertEqual(record['email'], 'staff@example.com')
+        self.assertNotIn('password', record)
+        self.assertNotIn('otp_secret', record)
+
+    def test_csv_export(self):
+        response = self.client.get(self.url)
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,email,first_name,last_name,is_email_verified,is_active,date_joined,last_login')
+        self.assertEqual(len(lines), 2)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BulkRegisterTestCase(APITestCase):
+
+    def setUp(self):
+        staff = User.objects.create_user('staff@example.com', 'password', is_staff=True)
+        self.client.force_authenticate(staff)
+        self.url = reverse('auth:register_bulk')
+
+    def test_batches_do_not_share_the_signup_limit(self):
+        """Test that bulk registration is not held to the public register limit of 3 per hour."""
+        limiter_keys = ['ratelimit:register:127.0.0.1', 'ratelimit:register_bulk:127.0.0.1']
+        get_redis().delete(*limiter_keys)
+        self.addCleanup(get_redis().delete, *limiter_keys)
+
+        for i in range(5):
+            response = self.client.post(self.url, {'users': [{'email': f'batch{i}@example.com'}]}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @patch('apps.core.tasks.send_bulk_email_task.delay')
+    def test_per_item_results_and_one_email_task(self, mock_bulk_email):
+        """Test that valid users are created and welcomed by a single batched task."""
+        users = [
+            {'email': 'one@example.com', 'first_name': 'One', 'password': 'pw1', 'password_confirm': 'pw1'},
+            {'email': 'two@example.com', 'password': 'pw2', 'password_confirm': 'pw2'},
+            {'email': 'staff@example.com'},
+            {'email': 'one@example.com'},
+            {'email': 'three@example.com', 'password': 'pw3', 'password_confirm': 'nope'},
+        ]
+        response = self.client.post(self.url, {'users': users}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['status'] for r in response.data['results']],
+            ['created', 'created', 'exists', 'exists', 'invalid']
+        )
+        self.assertTrue(User.objects.get(email='one@example.com').check_password('pw1'))
+
+        self.assertEqual(OutboxMessage.objects.filter(kind=OutboxMessage.KIND_EMAIL_BATCH).count(), 1)
+        dispatch_batch(10)
+        mock_bulk_email.assert_called_once()
+        self.assertEqual(
+            [m['recipient_list'] for m in mock_bulk_email.call_args[0][0]],
+            [['one@example.com'], ['two@example.com']]
+        )
+
+    def test_requires_staff_or_add_user_permission(self):
+        self.client.force_authenticate(User.objects.create_user('user@example.com', 'password'))
+        response = self.client.post(self.url, {'users': [{'email': 'x@example.com'}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AuthQueryCountTestCase(APITestCase):
+    """
+    Fixed statement counts per auth flow (savepoints included, since tests run
+    inside a transaction). A change here means a flow started writing more.
+    """
+
+    def setUp(self):
+        # Rate limit windows and OTP state these flows touch, so no test is limited by an earlier one.
+        limiter_keys = [
+            'ratelimit:register:127.0.0.1',
+            'ratelimit:login:127.0.0.1',
+            'ratelimit:otp_verify:127.0.0.1',
+            'ratelimit:otp_request:ip:127.0.0.1',
+            'ratelimit:otp_request:email:pending',
+            redis_keys.otp_request_rate_key('new@example.com'),
+            redis_keys.otp_failed_key('member@example.com'),
+            redis_keys.otp_lockout_key('member@example.com'),
+        ]
+        cache_keys = [redis_keys.otp_key('new@example.com'), redis_keys.otp_key('member@example.com')]
+
+        def clear_state():
+            get_redis().delete(*limiter_keys)
+            cache.delete_many(cache_keys)
+
+        clear_state()
+        self.addCleanup(clear_state)
+        self.user = User.objects.create_user('member@example.com', 'password', first_name='Ada')
+
+    def test_register(self):
+        # existence check, savepoint, user insert, outbox insert, release
+        with self.assertNumQueries(5):
+            response = self.client.post(reverse('auth:register'), {
+                'email': 'new@example.com', 'password': 'pw', 'password_confirm': 'pw'
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_otp_request(self):
+        with self.assertNumQueries(7):
+            response = self.client.post(reverse('auth:otp_request'), {'email': 'new@example.com'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+    def test_otp_verify(self):
+        """Test that verification flips the flag with one conditional UPDATE, and not at all once set."""
+        url = reverse('auth:otp_verify')
+        cache.set(redis_keys.otp_key('member@example.com'), '123456', 300)
+        with self.assertNumQueries(2):
+            response = self.client.post(url, {'email': 'member@example.com', 'otp': '123456'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        cache.set(redis_keys.otp_key('member@example.com'), '654321', 300)
+        with self.assertNumQueries(1):
+            response = self.client.post(url, {'email': 'member@example.com', 'otp': '654321'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_login(self):
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                reverse('auth:login'), {'email': 'member@example.com', 'password': 'password'}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_profile(self):
+        """Test that profile updates write only changed columns and skip no-op saves."""
+        self.client.force_authenticate(self.user)
+        url = reverse('auth:profile')
 
-        mock_send_otp_email.assert_called_with(self.test_email, mock_send_otp_email.call_args[0][1])
-        audit_call_args = mock_write_audit_log.call_args[0]
-        self.assertEqual(audit_call_args[0], 'OTP_REQUESTED')  # event
-        self.assertEqual(audit_call_args[1], self.test_email)  # email
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        with self.assertNumQueries(4):
+            self.client.patch(url, {'first_name': 'Grace'}, format='json')
+        with self.assertNumQueries(3):
+            self.client.patch(url, {'first_name': 'Grace'}, format='json')
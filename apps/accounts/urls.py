@@ -11,7 +11,10 @@ urlpatterns = [
     path('otp/verify/', views.otp_verify, name='otp_verify'),
 
     path('register/', views.RegisterView.as_view(), name='register'),
+    path('register/bulk/', views.BulkRegisterView.as_view(), name='register_bulk'),
     path('profile/', views.UserProfileView.as_view(), name='profile'),
+    path('users/search/', views.UserSearchView.as_view(), name='user_search'),
+    path('users/export/', views.UserExportView.as_view(), name='user_export'),
     path('login/', views.login, name='login'),
     path('token/', views.CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
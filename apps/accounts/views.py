@@ -2,12 +2,15 @@
 import random
 import string
 import time
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
+from django.db import router, transaction
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from rest_framework import status, generics
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, BasePermission, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from apps.core.status_codes import (
     SuccessResponses, ErrorResponses, HTTP_202_ACCEPTED,
@@ -15,12 +18,19 @@ from apps.core.status_codes import (
 )
 from rest_framework_simplejwt.views import TokenObtainPairView
 from apps.accounts.models import User
+from apps.accounts.bulk import build_user, hash_passwords, insert_users
+from apps.accounts.export import CONTENT_TYPES, export_users
+from apps.accounts.search import search_users
 from apps.accounts.serializers import (
-    UserSerializer, OTPSerializer, OTPVerifySerializer,
+    UserSerializer, BulkRegisterUserSerializer, OTPSerializer, OTPVerifySerializer,
     LoginSerializer, TokenSerializer
 )
-from apps.core.tasks import send_email_task
+from apps.core.outbox import enqueue_email, enqueue_email_batch, enqueue_otp_email
 from apps.core.logger import auth_logger
+from apps.core.audit_policy import record_audit_event
+from apps.core.db_router import ReplicaReadMixin
+from apps.core.conditional import if_match_failed, if_none_match, make_etag
+from apps.core import redis_keys
 
 
 @extend_schema(
@@ -52,23 +62,124 @@ class RegisterView(generics.CreateAPIView):
     permission_classes = [AllowAny]
 
     def perform_create(self, serializer):
-        user = serializer.save()
+        with transaction.atomic():
+            user = serializer.save()
+            enqueue_email(**welcome_email(user))
         auth_logger.info(f"New user registered: {user.email}")
-        send_email_task.delay(
-            subject="Welcome to TSES App",
-            message=f"Welcome {user.first_name or user.email}! Your account has been created.",
-            recipient_list=[user.email]
+
+
+def welcome_email(user):
+    return {
+        'subject': "Welcome to TSES App",
+        'message': f"Welcome {user.first_name or user.email}! Your account has been created.",
+        'recipient_list': [user.email],
+    }
+
+
+class CanRegisterUsers(BasePermission):
+    """Staff, or partner accounts granted the accounts.add_user permission."""
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and (user.is_staff or user.has_perm('accounts.add_user')))
+
+
+@extend_schema(
+    summary="Bulk User Registration",
+    description=(
+        "Register up to BULK_REGISTER_MAX_USERS users in one request. Each item is validated like "
+        "/register/; valid users are inserted in one batch and welcomed by a single batched email task. "
+        "Returns a result per item: created, exists or invalid."
+    ),
+    request={
+        "type": "object",
+        "properties": {"users": {"type": "array", "items": {"type": "object"}}}
+    },
+    responses={
+        200: {"type": "object"},
+        400: "Bad Request - users must be a non-empty list within the size limit",
+        401: "Unauthorized",
+        403: "Forbidden - staff or accounts.add_user permission required"
+    }
+)
+class BulkRegisterView(generics.GenericAPIView):
+    permission_classes = [CanRegisterUsers]
+
+    def post(self, request):
+        items = request.data.get('users') if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or not items:
+            response_data, status_code = ErrorResponses.invalid_request("users must be a non-empty list")
+            return Response(response_data, status=status_code)
+        if len(items) > settings.BULK_REGISTER_MAX_USERS:
+            response_data, status_code = ErrorResponses.invalid_request(
+                f"At most {settings.BULK_REGISTER_MAX_USERS} users per request"
+            )
+            return Response(response_data, status=status_code)
+
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            serializer = BulkRegisterUserSerializer(data=item)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                email = item.get('email') if isinstance(item, dict) else None
+                results[index] = {'index': index, 'email': email, 'status': 'invalid', 'errors': serializer.errors}
+
+        with ThreadPoolExecutor(settings.BULK_REGISTER_HASH_WORKERS) as executor:
+            hashes = hash_passwords([data.get('password') for _, data in valid], executor)
+        users = [
+            build_user(
+                data['email'], password_hash,
+                first_name=data.get('first_name'),
+                last_name=data.get('last_name'),
+                is_email_verified=data.get('is_email_verified', False),
+            )
+            for (_, data), password_hash in zip(valid, hashes)
+        ]
+
+        with transaction.atomic():
+            created = insert_users(users)
+            # insert_users keeps the first occurrence of a repeated email, so welcome that one.
+            welcomed = {}
+            for user in users:
+                if user.email in created:
+                    welcomed.setdefault(user.email, welcome_email(user))
+            if welcomed:
+                enqueue_email_batch(welcomed.values())
+
+        for (index, _), user in zip(valid, users):
+            # pop() so a repeated email in the same request reports 'exists' after the first
+            pk = created.pop(user.email, None)
+            results[index] = {'index': index, 'email': user.email, 'status': 'created' if pk else 'exists', 'id': pk}
+
+        summary = {status_name: sum(r['status'] == status_name for r in results) for status_name in ('created', 'exists', 'invalid')}
+        record_audit_event(
+            request,
+            event='USERS_BULK_REGISTERED',
+            email=request.user.email,
+            ip=request.META.get('REMOTE_ADDR', ''),
+            meta=summary
         )
+        auth_logger.info(f"Bulk registration by {request.user.email}: {summary}")
+
+        return Response({'success': True, **summary, 'results': results})
 
 
 @extend_schema(
     summary="User Profile",
-    description="Get or update the authenticated user's profile information.",
+    description=(
+        "Get or update the authenticated user's profile information. "
+        "Responses carry an ETag; send it back as If-None-Match to get 304 when unchanged, "
+        "or as If-Match on PUT/PATCH to reject the update with 412 if the profile changed meanwhile."
+    ),
     request=UserSerializer,
     responses={
         200: UserSerializer,
+        304: "Not Modified",
         401: "Unauthorized",
-        400: "Bad Request"
+        400: "Bad Request",
+        412: "Precondition Failed - profile was modified since it was fetched"
     }
 )
 
@@ -79,6 +190,107 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         return self.request.user
 
+    @staticmethod
+    def profile_etag(user):
+        return make_etag('user', user.pk, user.updated_at.isoformat())
+
+    def retrieve(self, request, *args, **kwargs):
+        etag = self.profile_etag(request.user)
+        if if_none_match(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        response = super().retrieve(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
+
+    def update(self, request, *args, **kwargs):
+        # Lock the row so the If-Match check and the write see the same version.
+        with transaction.atomic():
+            user = User.objects.select_for_update().get(pk=request.user.pk)
+            if if_match_failed(request, self.profile_etag(user)):
+                response_data, status_code = ErrorResponses.precondition_failed()
+                return Response(response_data, status=status_code)
+
+            serializer = self.get_serializer(user, data=request.data, partial=kwargs.pop('partial', False))
+            serializer.is_valid(raise_exception=True)
+            self.perform_update(serializer)
+
+        return Response(serializer.data, headers={'ETag': self.profile_etag(serializer.instance)})
+
+
+@extend_schema(
+    summary="Search Users",
+    description="Staff-only user search over email, first and last name. Prefix matches are returned before substring matches.",
+    parameters=[
+        OpenApiParameter(name='q', type=str, description='Search terms', required=True),
+        OpenApiParameter(name='limit', type=int, description='Maximum results (default 20, max 100)', required=False),
+        OpenApiParameter(name='is_active', type=bool, description='Filter by active status', required=False),
+        OpenApiParameter(name='is_email_verified', type=bool, description='Filter by email verification', required=False),
+    ],
+    responses={
+        200: UserSerializer(many=True),
+        401: "Unauthorized",
+        403: "Forbidden - staff only"
+    }
+)
+class UserSearchView(ReplicaReadMixin, generics.GenericAPIView):
+    serializer_class = UserSerializer
+    permission_classes = [IsAdminUser]
+    max_limit = 100
+
+    def get(self, request):
+        queryset = User.objects.only(
+            'id', 'email', 'first_name', 'last_name', 'is_email_verified', 'date_joined', 'last_login'
+        )
+        for flag in ('is_active', 'is_email_verified'):
+            value = request.query_params.get(flag)
+            if value is not None:
+                queryset = queryset.filter(**{flag: value.lower() in ('1', 'true', 'yes')})
+
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 20)), self.max_limit))
+        except ValueError:
+            response_data, status_code = ErrorResponses.invalid_request("limit must be an integer")
+            return Response(response_data, status=status_code)
+
+        users = search_users(queryset, request.query_params.get('q', ''), limit)
+        return Response(self.get_serializer(users, many=True).data)
+
+
+@extend_schema(
+    summary="Export Users",
+    description="Staff-only streaming export of all users (no password hashes or OTP data).",
+    parameters=[
+        OpenApiParameter(name='output', type=str, enum=list(CONTENT_TYPES), description='csv (default) or ndjson', required=False),
+        OpenApiParameter(name='gzip', type=bool, description='Gzip the stream', required=False),
+    ],
+    responses={
+        200: {"type": "string", "format": "binary"},
+        400: "Bad Request - unknown output format",
+        401: "Unauthorized",
+        403: "Forbidden - staff only"
+    }
+)
+class UserExportView(ReplicaReadMixin, generics.GenericAPIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        # ``format`` is reserved by DRF's content negotiation, hence ``output``.
+        output_format = request.query_params.get('output', 'csv')
+        if output_format not in CONTENT_TYPES:
+            response_data, status_code = ErrorResponses.invalid_request("output must be csv or ndjson")
+            return Response(response_data, status=status_code)
+        gzip = request.query_params.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+        # The stream is consumed after the request's routing state ends, so pin the alias now.
+        response = StreamingHttpResponse(
+            export_users(output_format, gzip, using=router.db_for_read(User)),
+            content_type='application/gzip' if gzip else CONTENT_TYPES[output_format],
+        )
+        filename = f"users.{output_format}{'.gz' if gzip else ''}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
 
 @extend_schema(
     summary="Request OTP",
@@ -119,12 +331,13 @@ def otp_request(request):
 
     from apps.core.rate_limits import RedisRateLimiter
     limiter = RedisRateLimiter()
-    email_key = f"ratelimit:otp_request:email:{email}"
+    email_key = redis_keys.otp_request_rate_key(email)
     email_config = {
         'requests': settings.RATE_LIMITS.get('otp_request_email', {'requests': 3, 'window': 600})
     }
 
-    if limiter.is_rate_limited(email_key, email_config['requests']['requests'], email_config['requests']['window']):
+    if limiter.is_rate_limited(email_key, email_config['requests']['requests'], email_config['requests']['window'],
+                               'otp_request_email'):
         reset_time = limiter.get_reset_time(email_key, email_config['requests']['window'])
         response_data, status_code = ErrorResponses.rate_limit_exceeded(
             "Too many OTP requests for this email. Try again later.",
@@ -139,33 +352,31 @@ def otp_request(request):
     logger = logging.getLogger(__name__)
     logger.info(f"OTP generated for {email}: {otp_code}")
 
-    otp_key = f"otp:{email}"
-    cache.set(otp_key, otp_code, timeout=300) 
+    otp_key = redis_keys.otp_key(email)
+    cache.set(otp_key, otp_code, timeout=settings.OTP_EXPIRY_SECONDS)
 
-    limiter.redis.zadd(email_key, {time.time(): time.time()})
-    limiter.redis.expire(email_key, email_config['requests']['window'] * 2)
+    limiter.add_request(email_key, email_config['requests']['window'])
 
-    user, created = User.objects.get_or_create(
-        email=email,
-        defaults={'is_active': True}
-    )
-
-    from apps.core.tasks import send_otp_email
-    send_otp_email.delay(email, otp_code)
+    with transaction.atomic():
+        user, created = User.objects.get_or_create(
+            email=email,
+            defaults={'is_active': True}
+        )
+        enqueue_otp_email(email)
 
-    from apps.core.tasks import write_audit_log
-    write_audit_log.delay(
+    record_audit_event(
+        request,
         event='OTP_REQUESTED',
         email=email,
         ip=request.META.get('REMOTE_ADDR', ''),
         meta={
             'created': created,
             'otp_code': otp_code,  # Log OTP code for debugging
-            'expires_in': 300
+            'expires_in': settings.OTP_EXPIRY_SECONDS
         }
     )
 
-    response_data, status_code = SuccessResponses.otp_requested(email, 300)
+    response_data, status_code = SuccessResponses.otp_requested(email, settings.OTP_EXPIRY_SECONDS)
     return Response(response_data, status=status_code)
 
 
@@ -207,10 +418,10 @@ def otp_verify(request):
     from apps.core.rate_limits import RedisRateLimiter
     limiter = RedisRateLimiter()
 
-    failed_key = f"otp_failed:{email}"
-    lockout_key = f"otp_lockout:{email}"
+    failed_key = redis_keys.otp_failed_key(email)
+    lockout_key = redis_keys.otp_lockout_key(email)
 
-    lockout_time = limiter.redis.get(lockout_key)
+    lockout_time = limiter.get(lockout_key)
     if lockout_time:
         lockout_time = float(lockout_time)
         remaining_time = max(0, int(lockout_time - time.time()))
@@ -218,7 +429,7 @@ def otp_verify(request):
             response_data, status_code = ErrorResponses.otp_locked(remaining_time)
             return Response(response_data, status=status_code)
 
-    otp_key = f"otp:{email}"
+    otp_key = redis_keys.otp_key(email)
     stored_otp = cache.get(otp_key)
 
     if not stored_otp or stored_otp != otp_code:
@@ -228,8 +439,8 @@ def otp_verify(request):
         if failed_attempts >= 5:
             limiter.set_with_expiry(lockout_key, time.time() + 900, 900)
 
-            from apps.core.tasks import write_audit_log
-            write_audit_log.delay(
+            record_audit_event(
+                request,
                 event='OTP_LOCKED',
                 email=email,
                 ip=request.META.get('REMOTE_ADDR', ''),
@@ -239,8 +450,8 @@ def otp_verify(request):
             response_data, status_code = ErrorResponses.otp_locked(900)
             return Response(response_data, status=status_code)
 
-        from apps.core.tasks import write_audit_log
-        write_audit_log.delay(
+        record_audit_event(
+            request,
             event='OTP_FAILED',
             email=email,
             ip=request.META.get('REMOTE_ADDR', ''),
@@ -252,22 +463,25 @@ def otp_verify(request):
 
     cache.delete(otp_key)
 
-    limiter.reset_counter(failed_key)
-    limiter.reset_counter(lockout_key)
+    limiter.reset_counter(failed_key, lockout_key)
 
     user, created = User.objects.get_or_create(
         email=email,
-        defaults={'is_active': True}
+        defaults={'is_active': True, 'is_email_verified': True}
     )
 
     if not user.is_email_verified:
+        # Conditional single-column UPDATE; concurrent verifications write once.
+        User.objects.filter(pk=user.pk, is_email_verified=False).update(
+            is_email_verified=True,
+            updated_at=timezone.now()
+        )
         user.is_email_verified = True
-        user.save()
 
     tokens = TokenSerializer.get_token(user)
 
-    from apps.core.tasks import write_audit_log
-    write_audit_log.delay(
+    record_audit_event(
+        request,
         event='OTP_VERIFIED',
         email=email,
         ip=request.META.get('REMOTE_ADDR', ''),
@@ -0,0 +1,114 @@
+"""
+Per-user recent activity kept in a capped Redis list.
+
+Each committed audit row is pushed onto its email's list (LPUSHX + LTRIM),
+newest first. Lists only exist once warmed: a read that finds no list loads
+the latest rows from the database and writes them back. To avoid a row
+committed during that load being lost, the reader holds a warming marker and
+only writes if it is still present; a writer that finds the list missing
+deletes the marker, so the reader discards its now-stale snapshot.
+
+A user without activity gets a list holding only an empty placeholder entry,
+so they are not reloaded from the database on every read; readers skip it.
+"""
+import json
+from django.conf import settings
+from redis.exceptions import RedisClusterException, RedisError, WatchError
+from rest_framework.utils.encoders import JSONEncoder
+from apps.core.logger import system_logger
+from apps.core.redis_client import get_redis
+from apps.core.redis_keys import recent_activity_key, recent_activity_warming_key
+
+# Placeholder element of a warmed list with no activity; never a JSON entry.
+EMPTY_MARKER = ''
+
+
+def _encode(entry):
+    return json.dumps(entry, cls=JSONEncoder)
+
+
+def activity_entry(log, event, user_agent):
+    """The list representation of a freshly recorded row, without re-reading it."""
+    from apps.audit.serializers import AuditLogRowSerializer
+
+    row_serializer = AuditLogRowSerializer()
+    values = {
+        'id': log.pk,
+        'event': event,
+        'email': log.email,
+        'ip_address': log.ip_address,
+        'user_agent': user_agent,
+        'metadata': log.metadata,
+        'created_at': log.created_at,
+    }
+    return row_serializer.to_representation(tuple(values[field] for field in row_serializer.fields))
+
+
+def push_recent_activity(email, entry):
+    """Called after commit for every audit row; never raises."""
+    try:
+        redis = get_redis()
+        key = recent_activity_key(email)
+        if redis.lpushx(key, _encode(entry)):
+            pipe = redis.pipeline()
+            pipe.ltrim(key, 0, settings.AUDIT_RECENT_ACTIVITY_SIZE - 1)
+            pipe.expire(key, settings.AUDIT_RECENT_ACTIVITY_TTL)
+            pipe.execute()
+        else:
+            redis.delete(recent_activity_warming_key(email))
+    except (RedisError, RedisClusterException) as e:
+        system_logger.warning(f"Recent activity push failed for {email}: {e}")
+
+
+def _load_from_database(email):
+    from apps.audit.models import AuditLog
+    from apps.audit.serializers import AuditLogRowSerializer
+
+    row_serializer = AuditLogRowSerializer()
+    rows = row_serializer.rows(
+        AuditLog.objects.filter(email=email).order_by('-created_at', '-id')
+    )[:settings.AUDIT_RECENT_ACTIVITY_SIZE]
+    return row_serializer.serialize(rows)
+
+
+def _warm(redis, email, entries):
+    key = recent_activity_key(email)
+    marker = recent_activity_warming_key(email)
+
+    # Explicitly transactional: a RedisCluster pipeline is not by default and
+    # refuses WATCH. The marker and the list share a hash tag, hence a slot.
+    with redis.pipeline(transaction=True) as pipe:
+        try:
+            pipe.watch(marker)
+            if not pipe.exists(marker):
+                return
+            pipe.multi()
+            pipe.delete(key)
+            pipe.rpush(key, *([_encode(entry) for entry in entries] or [EMPTY_MARKER]))
+            pipe.expire(key, settings.AUDIT_RECENT_ACTIVITY_TTL)
+            pipe.delete(marker)
+            pipe.execute()
+        except WatchError:
+            pass
+
+
+def get_recent_activity(email, limit):
+    """Returns (entries, source) with source 'cache' or 'database'."""
+    try:
+        redis = get_redis()
+        cached = redis.lrange(recent_activity_key(email), 0, limit - 1)
+    except (RedisError, RedisClusterException) as e:
+        system_logger.warning(f"Recent activity read failed for {email}: {e}")
+        return _load_from_database(email)[:limit], 'database'
+
+    if cached:
+        return [json.loads(entry) for entry in cached if entry], 'cache'
+
+    try:
+        redis.set(recent_activity_warming_key(email), 1, ex=30)
+        entries = _load_from_database(email)
+        _warm(redis, email, entries)
+    except (RedisError, RedisClusterException) as e:
+        system_logger.warning(f"Recent activity warm-up failed for {email}: {e}")
+        entries = _load_from_database(email)
+    return entries[:limit], 'database'
@@ -1,17 +1,98 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.db.models import Max, Min
+from django.utils import timezone
 from django_json_widget.widgets import JSONEditorWidget
+from apps.audit.categories import EVENT_CATEGORIES, filter_event_category
 from apps.audit.models import AuditLog
+from apps.core.pagination import EstimatedCountPaginator
+
+
+class EventCategoryFilter(admin.SimpleListFilter):
+    """Fixed categories instead of listing every distinct event name."""
+
+    title = 'event category'
+    parameter_name = 'category'
+
+    def lookups(self, request, model_admin):
+        return [(category, category.title()) for category in EVENT_CATEGORIES]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return filter_event_category(queryset, self.value())
+        return queryset
+
+
+class CreatedRangeFilter(admin.SimpleListFilter):
+    """
+    Bounded created_at ranges in place of date_hierarchy, whose drill-down
+    runs SELECT DISTINCT over the whole table. Choices come from the indexed
+    min/max only, and every choice filters an index range.
+    """
+
+    title = 'created'
+    parameter_name = 'created'
+    months = 12
+
+    def lookups(self, request, model_admin):
+        choices = [('24h', 'Last 24 hours'), ('7d', 'Last 7 days'), ('30d', 'Last 30 days')]
+
+        bounds = AuditLog.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+        if bounds['first'] is None:
+            return choices
+
+        first = bounds['first'].astimezone(dt_timezone.utc)
+        year, month = bounds['last'].astimezone(dt_timezone.utc).timetuple()[:2]
+        for _ in range(self.months):
+            if (year, month) < (first.year, first.month):
+                break
+            label = datetime(year, month, 1).strftime('%B %Y')
+            choices.append((f'{year:04d}-{month:02d}', label))
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        return choices
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if not value:
+            return queryset
+
+        recent = {'24h': timedelta(days=1), '7d': timedelta(days=7), '30d': timedelta(days=30)}
+        if value in recent:
+            return queryset.filter(created_at__gte=timezone.now() - recent[value])
+
+        try:
+            year, month = (int(part) for part in value.split('-'))
+            start = datetime(year, month, 1, tzinfo=dt_timezone.utc)
+        except ValueError:
+            return queryset
+        end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=dt_timezone.utc)
+        return queryset.filter(created_at__gte=start, created_at__lt=end)
+
+
+class AuditLogChangeList(ChangeList):
+
+    def get_queryset(self, request, exclude_parameters=None):
+        # Load only what list_display renders; metadata and search_vector stay on disk.
+        return super().get_queryset(request, exclude_parameters).only(
+            'id', 'event', 'event__name', 'email', 'ip_address', 'created_at'
+        )
 
 
 @admin.register(AuditLog)
 class AuditLogAdmin(admin.ModelAdmin):
 
     list_display = ('event', 'email', 'ip_address', 'created_at')
-    list_filter = ('event', 'created_at', 'email')
-    search_fields = ('event', 'email', 'ip_address', 'user_agent')
+    list_filter = (EventCategoryFilter, CreatedRangeFilter)
+    list_select_related = ('event',)
+    search_fields = ('event__name', 'email', 'ip_address', 'user_agent__value')
     readonly_fields = ('id', 'event', 'email', 'ip_address', 'user_agent', 'metadata', 'created_at')
     ordering = ('-created_at',)
 
+    # Large-table mode: no full COUNT(*) for the unfiltered total, bounded counts for pages
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    list_per_page = 50
 
     formfield_overrides = {
         AuditLog._meta.get_field('metadata').__class__: {
@@ -19,6 +100,9 @@ class AuditLogAdmin(admin.ModelAdmin):
         }
     }
 
+    def get_changelist(self, request, **kwargs):
+        return AuditLogChangeList
+
     def has_add_permission(self, request):
         return False
 
@@ -0,0 +1,280 @@
+"""
+Cold storage for aged-out audit logs.
+
+Each UTC day is written to a segment file of independently zlib-compressed
+blocks of NDJSON records sorted by (created_at, id), plus a JSON sidecar
+index holding the segment's time range, a bloom filter of its emails and the
+byte offset, length and time range of every block. Lookups consult only the
+sidecars, then mmap the matching segments and decompress matching blocks.
+
+Archived rows are deleted from the table, so AUDIT_ARCHIVE_DIR is the only copy
+of that history and must be persistent storage; there is no default.
+"""
+import base64
+import hashlib
+import heapq
+import json
+import math
+import mmap
+import os
+import zlib
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Min
+from django.utils import timezone
+from apps.audit.models import AuditLog
+
+SEGMENT_SUFFIX = '.ndjson.z'
+INDEX_SUFFIX = '.idx.json'
+
+ARCHIVE_COLUMNS = ('id', 'created_at', 'event__name', 'email', 'ip_address', 'user_agent__value', 'metadata')
+
+
+class BloomFilter:
+
+    def __init__(self, size_bits, hash_count, bits=None):
+        self.size_bits = size_bits
+        self.hash_count = hash_count
+        self.bits = bits if bits is not None else bytearray((size_bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        size_bits = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        hash_count = max(1, round(size_bits / capacity * math.log(2)))
+        return cls(size_bits, hash_count)
+
+    def _positions(self, value):
+        digest = hashlib.sha256(value.lower().encode()).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:16], 'big') | 1
+        return ((h1 + i * h2) % self.size_bits for i in range(self.hash_count))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    def to_dict(self):
+        return {
+            'size_bits': self.size_bits,
+            'hash_count': self.hash_count,
+            'bits': base64.b64encode(bytes(self.bits)).decode(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['size_bits'], data['hash_count'], bytearray(base64.b64decode(data['bits'])))
+
+
+def _to_record(row):
+    pk, created_at, event, email, ip_address, user_agent, metadata = row
+    return {
+        'id': pk,
+        'event': event,
+        'email': email,
+        'ip_address': ip_address,
+        'user_agent': user_agent or '',
+        'metadata': metadata,
+        'created_at': created_at.astimezone(dt_timezone.utc).isoformat(),
+    }
+
+
+def segment_name(day):
+    return f'audit-{day.isoformat()}'
+
+
+def _archive_dir(directory):
+    directory = directory or settings.AUDIT_ARCHIVE_DIR
+    if not directory:
+        raise ImproperlyConfigured('AUDIT_ARCHIVE_DIR must point at persistent storage for archived audit logs')
+    return directory
+
+
+def _sort_key(record):
+    return _parse(record['created_at']), record['id']
+
+
+def _load_index(directory, name):
+    path = os.path.join(directory, name + INDEX_SUFFIX)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def _read_blocks(directory, index, blocks):
+    with open(os.path.join(directory, index['segment']), 'rb') as segment:
+        with mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for block in blocks:
+                raw = zlib.decompress(data[block['offset']:block['offset'] + block['length']])
+                for line in raw.decode().splitlines():
+                    yield json.loads(line)
+
+
+def _merge(archived, fresh):
+    """Merge two (created_at, id)-sorted record streams, dropping ids already archived."""
+    last_id = None
+    for record in heapq.merge(archived, fresh, key=_sort_key):
+        if record['id'] != last_id:
+            yield record
+        last_id = record['id']
+
+
+def write_segment(directory, day, block_size):
+    """
+    Export one UTC day of audit logs. Returns the number of table rows exported.
+    Rows for a day that already has a segment (late writes, or a crash before
+    the rows were deleted) are merged into it rather than replacing it. Files
+    are written under temporary names and renamed, so a crash never leaves a
+    partial segment behind.
+    """
+    start = datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+    end = start + timedelta(days=1)
+    rows = (
+        AuditLog.objects
+        .filter(created_at__gte=start, created_at__lt=end)
+        .order_by('created_at', 'id')
+        .values_list(*ARCHIVE_COLUMNS)
+    )
+
+    name = segment_name(day)
+    segment_path = os.path.join(directory, name + SEGMENT_SUFFIX)
+    index_path = os.path.join(directory, name + INDEX_SUFFIX)
+    emails = set()
+    blocks = []
+    count = 0
+    exported = 0
+
+    def fresh_records():
+        nonlocal exported
+        for row in rows.iterator(chunk_size=block_size):
+            exported += 1
+            yield _to_record(row)
+
+    records = fresh_records()
+    existing = _load_index(directory, name)
+    if existing is not None:
+        records = _merge(_read_blocks(directory, existing, existing['blocks']), records)
+
+    with open(segment_path + '.tmp', 'wb') as segment:
+        batch = []
+
+        def flush_block():
+            data = zlib.compress(''.join(json.dumps(r, default=str) + '\n' for r in batch).encode())
+            blocks.append({
+                'offset': segment.tell(),
+                'length': len(data),
+                'count': len(batch),
+                'from': batch[0]['created_at'],
+                'to': batch[-1]['created_at'],
+            })
+            segment.write(data)
+            batch.clear()
+
+        for record in records:
+            emails.add(record['email'])
+            batch.append(record)
+            count += 1
+            if len(batch) >= block_size:
+                flush_block()
+        if batch:
+            flush_block()
+        segment.flush()
+        os.fsync(segment.fileno())
+
+    if not exported:
+        os.remove(segment_path + '.tmp')
+        return 0
+
+    bloom = BloomFilter.for_capacity(len(emails))
+    for email in emails:
+        bloom.add(email)
+
+    with open(index_path + '.tmp', 'w', encoding='utf-8') as index:
+        json.dump({
+            'segment': name + SEGMENT_SUFFIX,
+            'from': blocks[0]['from'],
+            'to': blocks[-1]['to'],
+            'count': count,
+            'emails': bloom.to_dict(),
+            'blocks': blocks,
+        }, index)
+        index.flush()
+        os.fsync(index.fileno())
+
+    os.replace(segment_path + '.tmp', segment_path)
+    os.replace(index_path + '.tmp', index_path)
+    return exported
+
+
+def archive_before(cutoff, directory=None, block_size=None):
+    """
+    Archive and delete every full UTC day of audit logs older than cutoff.
+    Returns (segments_written, rows_archived).
+    """
+    directory = _archive_dir(directory)
+    block_size = block_size or settings.AUDIT_ARCHIVE_BLOCK_SIZE
+    os.makedirs(directory, exist_ok=True)
+
+    last_day = cutoff.astimezone(dt_timezone.utc).date()
+    oldest = AuditLog.objects.filter(created_at__lt=cutoff).aggregate(oldest=Min('created_at'))['oldest']
+    if oldest is None:
+        return 0, 0
+
+    segments = archived = 0
+    day = oldest.astimezone(dt_timezone.utc).date()
+    while day < last_day:
+        written = write_segment(directory, day, block_size)
+        if written:
+            start = datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+            AuditLog.objects.filter(created_at__gte=start, created_at__lt=start + timedelta(days=1)).delete()
+            segments += 1
+            archived += written
+        day += timedelta(days=1)
+    return segments, archived
+
+
+def archive_expired(directory=None):
+    cutoff = timezone.now() - timedelta(days=settings.AUDIT_ARCHIVE_AFTER_DAYS)
+    return archive_before(cutoff, directory)
+
+
+def _parse(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def search(email=None, from_datetime=None, to_datetime=None, directory=None):
+    """Yield archived records matching the email and/or time range, in time order."""
+    directory = _archive_dir(directory)
+    if not os.path.isdir(directory):
+        return
+
+    email = email.lower() if email else None
+    for index_name in sorted(n for n in os.listdir(directory) if n.endswith(INDEX_SUFFIX)):
+        index = _load_index(directory, index_name[:-len(INDEX_SUFFIX)])
+
+        if from_datetime and _parse(index['to']) < from_datetime:
+            continue
+        if to_datetime and _parse(index['from']) > to_datetime:
+            continue
+        if email and email not in BloomFilter.from_dict(index['emails']):
+            continue
+
+        blocks = [
+            block for block in index['blocks']
+            if not (from_datetime and _parse(block['to']) < from_datetime)
+            and not (to_datetime and _parse(block['from']) > to_datetime)
+        ]
+        for record in _read_blocks(directory, index, blocks):
+            if email and record['email'].lower() != email:
+                continue
+            created_at = _parse(record['created_at'])
+            if from_datetime and created_at < from_datetime:
+                continue
+            if to_datetime and created_at > to_datetime:
+                continue
+            yield record
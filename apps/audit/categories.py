@@ -0,0 +1,22 @@
+from django.db.models import Q
+
+# Event categories matched by keywords in the event name, shared by the
+# API's event_type filter and the admin's category filter.
+EVENT_CATEGORIES = {
+    'auth': ('login', 'logout', 'token', 'otp', 'password'),
+    'user': ('user', 'profile', 'register', 'account'),
+    'security': ('lock', 'unlock', 'failed', 'suspicious'),
+    'admin': ('admin', 'staff', 'permission'),
+    'system': ('system', 'cleanup', 'maintenance'),
+}
+
+
+def filter_event_category(queryset, category):
+    keywords = EVENT_CATEGORIES.get(category.lower())
+    if not keywords:
+        return queryset
+
+    condition = Q()
+    for keyword in keywords:
+        condition |= Q(event__name__icontains=keyword)
+    return queryset.filter(condition)
@@ -0,0 +1,28 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.audit.archive import archive_before
+
+
+class Command(BaseCommand):
+    help = 'Move aged-out audit logs into compressed, indexed archive segments and delete them from the table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int, default=settings.AUDIT_ARCHIVE_AFTER_DAYS,
+            help='Archive whole UTC days older than this many days'
+        )
+        parser.add_argument('--directory', default=settings.AUDIT_ARCHIVE_DIR, help='Archive directory')
+        parser.add_argument(
+            '--block-size', type=int, default=settings.AUDIT_ARCHIVE_BLOCK_SIZE,
+            help='Records per compressed block'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        segments, archived = archive_before(cutoff, options['directory'], options['block_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Archived {archived} audit logs into {segments} segments in {options["directory"]}')
+        )
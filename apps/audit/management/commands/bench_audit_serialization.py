@@ -0,0 +1,58 @@
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.utils.encoders import JSONEncoder
+from apps.audit.models import AuditLog
+from apps.audit.serializers import AuditLogSerializer, AuditLogRowSerializer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark audit log list serialization: ModelSerializer vs. the values_list() fast path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-sizes', default='25,100,500', help='Comma-separated page sizes')
+        parser.add_argument('--rounds', type=int, default=20, help='Pages serialized per measurement')
+
+    def handle(self, *args, **options):
+        try:
+            page_sizes = [int(size) for size in options['page_sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--page-sizes must be comma-separated integers')
+        rounds = options['rounds']
+
+        # Seed rows inside a transaction that is rolled back, so the benchmark leaves no trace.
+        with transaction.atomic():
+            missing = max(page_sizes) - AuditLog.objects.count()
+            for i in range(max(missing, 0)):
+                AuditLog.objects.record(
+                    'GET /api/v1/audit/logs/', f'bench{i % 50}@example.com', '10.0.0.1',
+                    'Mozilla/5.0 (bench)', {'method': 'GET', 'status_code': 200, 'duration_ms': 12.5}
+                )
+
+            queryset = AuditLog.objects.select_related('event', 'user_agent').order_by('-created_at')
+            row_serializer = AuditLogRowSerializer()
+
+            for size in page_sizes:
+                model_data = AuditLogSerializer(queryset[:size], many=True).data
+                fast_data = row_serializer.serialize(row_serializer.rows(queryset)[:size])
+                if json.dumps(model_data, cls=JSONEncoder) != json.dumps(fast_data, cls=JSONEncoder):
+                    raise CommandError(f'Fast path output differs from AuditLogSerializer at page size {size}')
+
+                start = time.perf_counter()
+                for _ in range(rounds):
+                    AuditLogSerializer(queryset[:size], many=True).data
+                model_elapsed = time.perf_counter() - start
+
+                start = time.perf_counter()
+                for _ in range(rounds):
+                    row_serializer.serialize(row_serializer.rows(queryset)[:size])
+                fast_elapsed = time.perf_counter() - start
+
+                total = size * rounds
+                self.stdout.write(f'Page size {size}:')
+                self.stdout.write(f'  ModelSerializer: {total / model_elapsed:,.0f} rows/s')
+                self.stdout.write(f'  values_list():   {total / fast_elapsed:,.0f} rows/s')
+                self.stdout.write(self.style.SUCCESS(f'  Speedup: {model_elapsed / fast_elapsed:.1f}x'))
+
+            transaction.set_rollback(True)
@@ -0,0 +1,36 @@
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from apps.audit.archive import search
+
+
+class Command(BaseCommand):
+    help = 'Search archived audit logs by email and/or time range, printing matches as NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help='Exact email address (case-insensitive)')
+        parser.add_argument('--from-datetime', help='ISO datetime, inclusive')
+        parser.add_argument('--to-datetime', help='ISO datetime, inclusive')
+        parser.add_argument('--directory', default=settings.AUDIT_ARCHIVE_DIR, help='Archive directory')
+
+    def _parse(self, value, name):
+        if value is None:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None or parsed.tzinfo is None:
+            raise CommandError(f'--{name} must be an ISO datetime with a timezone')
+        return parsed
+
+    def handle(self, *args, **options):
+        from_datetime = self._parse(options['from_datetime'], 'from-datetime')
+        to_datetime = self._parse(options['to_datetime'], 'to-datetime')
+        if not (options['email'] or from_datetime or to_datetime):
+            raise CommandError('Provide --email and/or a time range')
+
+        matches = 0
+        for record in search(options['email'], from_datetime, to_datetime, options['directory']):
+            self.stdout.write(json.dumps(record))
+            matches += 1
+
+        self.stderr.write(f'{matches} matching records')
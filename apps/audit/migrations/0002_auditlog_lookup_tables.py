@@ -0,0 +1,50 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Audit Event',
+                'verbose_name_plural': 'Audit Events',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserAgent',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('value', models.CharField(max_length=500, unique=True)),
+            ],
+            options={
+                'verbose_name': 'User Agent',
+                'verbose_name_plural': 'User Agents',
+            },
+        ),
+        migrations.AlterField(
+            model_name='auditlog',
+            name='ip_address',
+            field=models.GenericIPAddressField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='event_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='audit.auditevent'),
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='user_agent_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='audit.useragent'),
+        ),
+    ]
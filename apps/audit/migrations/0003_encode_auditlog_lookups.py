@@ -0,0 +1,62 @@
+from django.db import migrations
+
+# Generic events used to be named "METHOD /path", so paths carrying object ids
+# produced one name each. Map them to the route names the middleware now uses
+# (PostgreSQL only; other backends keep the names as stored).
+LEGACY_EVENT_ROUTES = [
+    (r'^(\S+) /api/v1/audit/logs/\d+/$', r'\1 /api/v1/audit/logs/<int:pk>/'),
+    (r'^(\S+) /admin/(\w+)/(\w+)/[^/]+/(change|delete|history)/$', r'\1 /admin/\2/\3/<path:object_id>/\4/'),
+]
+
+
+def _event_name_sql(column, vendor):
+    if vendor != 'postgresql':
+        return column, []
+    params = []
+    for pattern, replacement in LEGACY_EVENT_ROUTES:
+        column = f'regexp_replace({column}, %s, %s)'
+        params += [pattern, replacement]
+    return column, params
+
+
+def encode_lookups(apps, schema_editor):
+    AuditLog = apps.get_model('audit', 'AuditLog')
+    AuditEvent = apps.get_model('audit', 'AuditEvent')
+    UserAgent = apps.get_model('audit', 'UserAgent')
+    quote = schema_editor.quote_name
+    vendor = schema_editor.connection.vendor
+
+    logs = quote(AuditLog._meta.db_table)
+    events = quote(AuditEvent._meta.db_table)
+    user_agents = quote(UserAgent._meta.db_table)
+    event_ref = quote(AuditLog._meta.get_field('event_ref').column)
+    user_agent_ref = quote(AuditLog._meta.get_field('user_agent_ref').column)
+
+    # One pass per lookup: insert the distinct values, then join them back.
+    event_name, params = _event_name_sql(f'{logs}.{quote("event")}', vendor)
+    schema_editor.execute(f'INSERT INTO {events} (name) SELECT DISTINCT {event_name} FROM {logs}', params)
+    schema_editor.execute(
+        f'UPDATE {logs} SET {event_ref} = e.id FROM {events} e WHERE e.name = {event_name}', params
+    )
+
+    schema_editor.execute(
+        f"INSERT INTO {user_agents} (value) SELECT DISTINCT user_agent FROM {logs} WHERE user_agent <> ''"
+    )
+    schema_editor.execute(
+        f'UPDATE {logs} SET {user_agent_ref} = u.id FROM {user_agents} u WHERE u.value = {logs}.user_agent'
+    )
+
+    if vendor != 'postgresql':
+        # Empty strings were only ever storable outside PostgreSQL's inet type.
+        schema_editor.execute(f"UPDATE {logs} SET ip_address = NULL WHERE ip_address = ''")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0002_auditlog_lookup_tables'),
+    ]
+
+    operations = [
+        migrations.RunPython(encode_lookups, migrations.RunPython.noop),
+    ]
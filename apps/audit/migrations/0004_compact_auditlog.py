@@ -0,0 +1,39 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0003_encode_auditlog_lookups'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='auditlog',
+            name='event',
+        ),
+        migrations.RemoveField(
+            model_name='auditlog',
+            name='user_agent',
+        ),
+        migrations.RemoveField(
+            model_name='auditlog',
+            name='updated_at',
+        ),
+        migrations.RenameField(
+            model_name='auditlog',
+            old_name='event_ref',
+            new_name='event',
+        ),
+        migrations.RenameField(
+            model_name='auditlog',
+            old_name='user_agent_ref',
+            new_name='user_agent',
+        ),
+        migrations.AlterField(
+            model_name='auditlog',
+            name='event',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='audit.auditevent'),
+        ),
+    ]
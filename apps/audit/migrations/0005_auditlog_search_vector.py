@@ -0,0 +1,52 @@
+# Generated by Django 6.0.1 on 2026-10-19 09:47
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Mirrors apps.audit.search.search_document for rows written before this migration.
+BACKFILL_SQL = r"""
+UPDATE audit_auditlog AS l SET search_vector =
+    setweight(to_tsvector('simple',
+        regexp_replace(e.name, '[/_\-:?=&]+', ' ', 'g') || ' ' || e.name || ' '
+        || l.email || ' ' || replace(l.email, '@', ' ')), 'A')
+    || setweight(to_tsvector('simple', regexp_replace(
+        concat_ws(' ', l.metadata->>'request', l.metadata->>'referer', l.metadata->>'status_code'),
+        '[/_\-:?=&]+', ' ', 'g')), 'B')
+    || setweight(to_tsvector('simple', regexp_replace(
+        coalesce((SELECT u.value FROM audit_useragent AS u WHERE u.id = l.user_agent_id), ''),
+        '[/_\-:?=&]+', ' ', 'g')), 'C')
+FROM audit_auditevent AS e
+WHERE e.id = l.event_id AND l.search_vector IS NULL
+"""
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(BACKFILL_SQL)
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS audit_auditlog_search_gin '
+        'ON audit_auditlog USING gin (search_vector)'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS audit_auditlog_search_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0004_compact_auditlog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditlog',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
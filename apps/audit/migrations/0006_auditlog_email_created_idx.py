@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-19 09:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0005_auditlog_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['email', '-created_at'], name='audit_email_created_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def create_ip_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS audit_auditlog_ip_gist '
+        'ON audit_auditlog USING gist (ip_address inet_ops)'
+    )
+
+
+def drop_ip_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS audit_auditlog_ip_gist')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0006_auditlog_email_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_ip_index, drop_ip_index),
+    ]
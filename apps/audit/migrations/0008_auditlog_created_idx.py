@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-19 09:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0007_auditlog_ip_gist'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['created_at'], name='audit_created_idx'),
+        ),
+    ]
@@ -1,16 +1,117 @@
-from django.db import models
-from apps.core.models import TimeStampedModel
+from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
 
 
-class AuditLog(TimeStampedModel):
-    event = models.CharField(max_length=255)
+class InterningManager(models.Manager):
+    """
+    Dictionary-encodes a repeated string: maps it to the id of its lookup row,
+    creating the row on first use and caching ids in-process.
+    """
+
+    def __init__(self, lookup_field):
+        super().__init__()
+        self.lookup_field = lookup_field
+        self._ids = {}
+
+    def intern(self, value):
+        pk = self._ids.get(value)
+        if pk is None:
+            pk = self.get_or_create(**{self.lookup_field: value})[0].pk
+            # Only cache ids that are committed; a rolled-back row must not be reused.
+            transaction.on_commit(lambda: self._remember(value, pk), using=self.db)
+        return pk
+
+    def _remember(self, value, pk):
+        if len(self._ids) >= settings.AUDIT_INTERN_CACHE_SIZE:
+            self._ids.clear()
+        self._ids[value] = pk
+
+    def clear_cache(self):
+        self._ids.clear()
+
+
+class AuditEvent(models.Model):
+    id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=255, unique=True)
+
+    objects = InterningManager('name')
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Audit Event'
+        verbose_name_plural = 'Audit Events'
+
+    def __str__(self):
+        return self.name
+
+
+class UserAgent(models.Model):
+    id = models.AutoField(primary_key=True)
+    value = models.CharField(max_length=500, unique=True)
+
+    objects = InterningManager('value')
+
+    class Meta:
+        verbose_name = 'User Agent'
+        verbose_name_plural = 'User Agents'
+
+    def __str__(self):
+        return self.value
+
+
+class AuditLogManager(models.Manager):
+
+    def record(self, event, email, ip_address=None, user_agent='', metadata=None):
+        from apps.audit.activity import activity_entry, push_recent_activity
+        from apps.audit.search import build_search_vector, uses_full_text
+
+        event = event[:255]
+        user_agent = (user_agent or '')[:500]
+        metadata = metadata or {}
+        search_vector = None
+        if uses_full_text(self.db):
+            search_vector = build_search_vector(event, email, user_agent, metadata)
+
+        log = self.create(
+            event_id=AuditEvent.objects.intern(event),
+            email=email,
+            ip_address=ip_address or None,
+            user_agent_id=UserAgent.objects.intern(user_agent) if user_agent else None,
+            metadata=metadata,
+            search_vector=search_vector,
+        )
+        entry = activity_entry(log, event, user_agent)
+        transaction.on_commit(lambda: push_recent_activity(email, entry), using=self.db)
+        return log
+
+
+class AuditLog(models.Model):
+    """
+    Append-only audit record. Rows are never updated, so there is no
+    updated_at, and the event name and user agent are stored once in lookup
+    tables and referenced by 4-byte ids. ip_address is a native inet on
+    PostgreSQL.
+    """
+    created_at = models.DateTimeField(auto_now_add=True)
+    event = models.ForeignKey(AuditEvent, on_delete=models.PROTECT, related_name='+')
     email = models.EmailField()
-    ip_address = models.GenericIPAddressField()
-    user_agent = models.CharField(max_length=500)  
+    ip_address = models.GenericIPAddressField(blank=True, null=True)
+    user_agent = models.ForeignKey(UserAgent, on_delete=models.PROTECT, blank=True, null=True, related_name='+')
     metadata = models.JSONField(default=dict, blank=True)
+    # Populated at insert on PostgreSQL only; GIN-indexed by migration 0005.
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
+
+    objects = AuditLogManager()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Time-range scans (archival, admin date ranges) and min/max lookups
+            models.Index(fields=['created_at'], name='audit_created_idx'),
+            # Serves "latest events for an email" when the recent-activity cache is cold
+            models.Index(fields=['email', '-created_at'], name='audit_email_created_idx'),
+        ]
         verbose_name = 'Audit Log'
         verbose_name_plural = 'Audit Logs'
 
@@ -0,0 +1,41 @@
+"""
+Subnet filtering of audit logs.
+
+On PostgreSQL ip_address is a native inet column, so ``ip_cidr`` compiles to
+the ``<<=`` (contained by or equal) operator, served by a GiST inet_ops index
+(migration 0007). Other backends match addresses in Python with ipaddress.
+"""
+import ipaddress
+from django.db import NotSupportedError, connections
+from django.db.models import GenericIPAddressField, Lookup
+
+
+@GenericIPAddressField.register_lookup
+class NetContainedOrEqual(Lookup):
+    lookup_name = 'net_contained_or_equal'
+    # The network string must not go through GenericIPAddressField.get_prep_value.
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        raise NotSupportedError('net_contained_or_equal requires PostgreSQL')
+
+    def as_postgresql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} <<= {rhs}::inet', (*lhs_params, *rhs_params)
+
+
+def parse_network(value):
+    """Parse '10.2.0.0/16', '2001:db8::/32' or a bare address; raises ValueError."""
+    return ipaddress.ip_network(value.strip(), strict=False)
+
+
+def filter_by_network(queryset, network):
+    if connections[queryset.db].vendor == 'postgresql':
+        return queryset.filter(ip_address__net_contained_or_equal=str(network))
+
+    matching = [
+        pk for pk, ip in queryset.exclude(ip_address=None).values_list('id', 'ip_address').iterator()
+        if ipaddress.ip_address(ip) in network
+    ]
+    return queryset.filter(pk__in=matching)
@@ -0,0 +1,68 @@
+"""
+Full-text search over audit logs.
+
+On PostgreSQL each row carries a weighted tsvector (event and email first,
+then selected metadata values, then the user agent) computed at insert time
+and indexed with GIN. Other backends fall back to AND-ed substring matches.
+"""
+import re
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F, Q, TextField, Value
+
+SEARCH_CONFIG = 'simple'
+
+_SEPARATORS = re.compile(r'[/_\-:?=&]+')
+
+
+def uses_full_text(using='default'):
+    return connections[using].vendor == 'postgresql'
+
+
+def _normalize(text):
+    """Split paths and identifiers so 'POST /api/v1/auth/otp/verify/' yields 'otp', 'verify', ..."""
+    return _SEPARATORS.sub(' ', str(text)).strip()
+
+
+def search_document(event, email, user_agent='', metadata=None):
+    """Returns the searchable text of an audit row, keyed by tsvector weight."""
+    metadata = metadata or {}
+    meta_text = ' '.join(
+        _normalize(metadata[key]) for key in settings.AUDIT_SEARCH_METADATA_KEYS
+        if metadata.get(key) not in (None, '')
+    )
+    return {
+        'A': f"{_normalize(event)} {event} {email} {email.replace('@', ' ')}",
+        'B': meta_text,
+        'C': _normalize(user_agent or ''),
+    }
+
+
+def build_search_vector(event, email, user_agent='', metadata=None):
+    vector = None
+    for weight, text in search_document(event, email, user_agent, metadata).items():
+        part = SearchVector(Value(text, output_field=TextField()), config=SEARCH_CONFIG, weight=weight)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def search_queryset(queryset, q):
+    q = q.strip()
+    if not q:
+        return queryset
+
+    if uses_full_text(queryset.db):
+        query = SearchQuery(q, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        )
+
+    for term in q.split():
+        queryset = queryset.filter(
+            Q(event__name__icontains=term) |
+            Q(email__icontains=term) |
+            Q(user_agent__value__icontains=term) |
+            Q(metadata__icontains=term)
+        )
+    return queryset
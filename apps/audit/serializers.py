@@ -4,6 +4,8 @@ from apps.audit.models import AuditLog
 
 
 class AuditLogSerializer(serializers.ModelSerializer):
+    event = serializers.CharField(source='event.name', read_only=True)
+    user_agent = serializers.CharField(source='user_agent.value', default='', read_only=True)
 
     class Meta:
         model = AuditLog
@@ -14,6 +16,24 @@ class AuditLogSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'event', 'email', 'ip_address',
                           'user_agent', 'metadata', 'created_at']
 
+    # Model columns each output field reads, used to narrow the SQL with .only()
+    model_columns = {
+        'id': ['id'],
+        'event': ['event', 'event__name'],
+        'email': ['email'],
+        'ip_address': ['ip_address'],
+        'user_agent': ['user_agent', 'user_agent__value'],
+        'metadata': ['metadata'],
+        'created_at': ['created_at'],
+    }
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
 
 class AuditLogDetailSerializer(AuditLogSerializer):
     formatted_metadata = serializers.SerializerMethodField()
@@ -21,6 +41,8 @@ class AuditLogDetailSerializer(AuditLogSerializer):
     class Meta(AuditLogSerializer.Meta):
         fields = AuditLogSerializer.Meta.fields + ['formatted_metadata']
 
+    model_columns = {**AuditLogSerializer.model_columns, 'formatted_metadata': ['metadata']}
+
     def get_formatted_metadata(self, obj):
         if not obj.metadata:
             return {}
@@ -31,3 +53,40 @@ class AuditLogDetailSerializer(AuditLogSerializer):
             formatted['timestamp_readable'] = formatted['timestamp']
 
         return formatted
+
+
+class AuditLogRowSerializer:
+    """
+    Read-only fast path for lists: reads exactly the serialized columns with
+    values_list() and builds the dicts directly, skipping model instantiation
+    and per-field DRF machinery. Output is identical to AuditLogSerializer.
+    """
+
+    columns = {
+        'id': 'id',
+        'event': 'event__name',
+        'email': 'email',
+        'ip_address': 'ip_address',
+        'user_agent': 'user_agent__value',
+        'metadata': 'metadata',
+        'created_at': 'created_at',
+    }
+
+    def __init__(self, fields=None):
+        self.fields = list(fields or AuditLogSerializer.Meta.fields)
+        # Reuse DRF's datetime field so timezone handling and format settings match.
+        self._datetime = serializers.DateTimeField()
+
+    def rows(self, queryset):
+        return queryset.values_list(*(self.columns[field] for field in self.fields))
+
+    def to_representation(self, row):
+        data = dict(zip(self.fields, row))
+        if 'created_at' in data:
+            data['created_at'] = self._datetime.to_representation(data['created_at'])
+        if 'user_agent' in data and data['user_agent'] is None:
+            data['user_agent'] = ''
+        return data
+
+    def serialize(self, rows):
+        return [self.to_representation(row) for row in rows]
@@ -1,3 +1,375 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from unittest.mock import MagicMock, patch
+from datetime import datetime, timezone as dt_timezone
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from redis.cluster import RedisCluster
+from redis.exceptions import RedisClusterException
+from rest_framework.test import APITestCase
+from apps.accounts.models import User
+from apps.audit import archive
+from apps.audit.models import AuditEvent, AuditLog, UserAgent
+from apps.audit.search import search_document
+from apps.audit.serializers import AuditLogRowSerializer, AuditLogSerializer
+from apps.core.pagination import EstimatedCountPaginator
+from apps.core.redis_client import get_redis
 
-# Create your tests here.
+
+class AuditLogStorageTestCase(TestCase):
+
+    def setUp(self):
+        AuditEvent.objects.clear_cache()
+        UserAgent.objects.clear_cache()
+
+    def test_repeated_values_are_interned(self):
+        """Test that event names and user agents are stored once and shared by id."""
+        first = AuditLog.objects.record('OTP_REQUESTED', 'a@example.com', '10.0.0.1', 'Mozilla/5.0')
+        second = AuditLog.objects.record('OTP_REQUESTED', 'b@example.com', '10.0.0.2', 'Mozilla/5.0')
+
+        self.assertEqual(first.event_id, second.event_id)
+        self.assertEqual(first.user_agent_id, second.user_agent_id)
+        self.assertEqual(AuditEvent.objects.count(), 1)
+        self.assertEqual(UserAgent.objects.count(), 1)
+
+    def test_rolled_back_lookup_row_is_not_cached(self):
+        """Test that an id is cached only once the row that holds it has committed."""
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                AuditEvent.objects.intern('OTP_REQUESTED')
+                raise RuntimeError
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pk = AuditEvent.objects.intern('OTP_REQUESTED')
+        self.assertTrue(AuditEvent.objects.filter(pk=pk).exists())
+        with self.assertNumQueries(0):
+            self.assertEqual(AuditEvent.objects.intern('OTP_REQUESTED'), pk)
+
+    def test_serializer_expands_lookups(self):
+        """Test that the API shape is unchanged by dictionary encoding."""
+        log = AuditLog.objects.record('OTP_VERIFIED', 'a@example.com', None, '', {'user_created': False})
+
+        data = AuditLogSerializer(AuditLog.objects.select_related('event', 'user_agent').get(pk=log.pk)).data
+        self.assertEqual(data['event'], 'OTP_VERIFIED')
+        self.assertEqual(data['user_agent'], '')
+        self.assertIsNone(data['ip_address'])
+        self.assertEqual(data['metadata'], {'user_created': False})
+
+    def test_row_serializer_matches_model_serializer(self):
+        """Test that the values_list() fast path produces the same output."""
+        AuditLog.objects.record('OTP_VERIFIED', 'a@example.com', None, '', {'user_created': False})
+        AuditLog.objects.record('OTP_REQUESTED', 'b@example.com', '10.0.0.2', 'Mozilla/5.0', {})
+        queryset = AuditLog.objects.select_related('event', 'user_agent').order_by('id')
+
+        row_serializer = AuditLogRowSerializer()
+        self.assertEqual(
+            row_serializer.serialize(row_serializer.rows(queryset)),
+            [dict(item) for item in AuditLogSerializer(queryset, many=True).data]
+        )
+
+
+class AuditArchiveTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for i, email in enumerate(['a@example.com', 'b@example.com', 'a@example.com']):
+            log = AuditLog.objects.record('OTP_REQUESTED', email, '10.0.0.1')
+            AuditLog.objects.filter(pk=log.pk).update(
+                created_at=datetime(2026, 1, 1 + i // 2, 12, i, tzinfo=dt_timezone.utc)
+            )
+        AuditLog.objects.record('OTP_REQUESTED', 'a@example.com', '10.0.0.1')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_archive_moves_old_days_to_segments(self):
+        """Test that whole old days are exported, indexed and removed from the table."""
+        cutoff = datetime(2026, 2, 1, tzinfo=dt_timezone.utc)
+        segments, archived = archive.archive_before(cutoff, self.directory, block_size=1)
+
+        self.assertEqual((segments, archived), (2, 3))
+        self.assertEqual(AuditLog.objects.count(), 1)
+
+        found = list(archive.search(email='A@example.com', directory=self.directory))
+        self.assertEqual([r['created_at'] for r in found], [
+            '2026-01-01T12:00:00+00:00', '2026-01-02T12:02:00+00:00'
+        ])
+        self.assertEqual(list(archive.search(email='nobody@example.com', directory=self.directory)), [])
+
+    def test_rerun_merges_into_existing_segment(self):
+        """Test that rows arriving for an archived day are added to its segment, not swapped in for it."""
+        cutoff = datetime(2026, 2, 1, tzinfo=dt_timezone.utc)
+        archive.archive_before(cutoff, self.directory, block_size=1)
+
+        late = AuditLog.objects.record('OTP_VERIFIED', 'c@example.com', '10.0.0.1')
+        AuditLog.objects.filter(pk=late.pk).update(created_at=datetime(2026, 1, 1, 12, 0, 30, tzinfo=dt_timezone.utc))
+        self.assertEqual(archive.archive_before(cutoff, self.directory, block_size=1), (1, 1))
+
+        found = list(archive.search(
+            from_datetime=datetime(2026, 1, 1, tzinfo=dt_timezone.utc),
+            to_datetime=datetime(2026, 1, 1, 23, tzinfo=dt_timezone.utc),
+            directory=self.directory,
+        ))
+        self.assertEqual([r['email'] for r in found], ['a@example.com', 'c@example.com', 'b@example.com'])
+
+    @override_settings(AUDIT_ARCHIVE_DIR=None)
+    def test_archive_directory_is_required(self):
+        with self.assertRaises(ImproperlyConfigured):
+            archive.archive_expired()
+        self.assertEqual(AuditLog.objects.count(), 4)
+
+    def test_search_by_time_range(self):
+        archive.archive_before(datetime(2026, 2, 1, tzinfo=dt_timezone.utc), self.directory)
+
+        found = list(archive.search(
+            from_datetime=datetime(2026, 1, 1, 12, 1, tzinfo=dt_timezone.utc),
+            to_datetime=datetime(2026, 1, 1, 23, tzinfo=dt_timezone.utc),
+            directory=self.directory,
+        ))
+        self.assertEqual([r['email'] for r in found], ['b@example.com'])
+
+
+class AuditLogSearchTestCase(APITestCase):
+
+    def setUp(self):
+        self.staff = User.objects.create_user('staff@example.com', 'password', is_staff=True)
+        self.client.force_authenticate(self.staff)
+        AuditLog.objects.record('POST /api/v1/auth/otp/verify/', 'a@example.com', '10.0.0.1', 'curl/8.0')
+        AuditLog.objects.record('OTP_LOCKED', 'b@example.com', '10.0.0.2', 'Mozilla/5.0')
+
+    def test_ip_cidr_filters_by_subnet(self):
+        AuditLog.objects.record('OTP_REQUESTED', 'c@example.com', '2001:db8::1')
+        url = reverse('audit:audit-log-list')
+
+        response = self.client.get(url, {'ip_cidr': '10.0.0.0/31'})
+        self.assertEqual(sorted(r['email'] for r in response.data['results']), ['a@example.com'])
+
+        response = self.client.get(url, {'ip_cidr': '2001:db8::/32'})
+        self.assertEqual([r['email'] for r in response.data['results']], ['c@example.com'])
+
+        self.assertEqual(self.client.get(url, {'ip_cidr': '10.0.0.0/99'}).status_code, 400)
+
+    @patch('apps.audit.search.uses_full_text', return_value=True)
+    def test_blank_query_is_not_ranked(self, mock_uses_full_text):
+        response = self.client.get(reverse('audit:audit-log-list'), {'q': '   '})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_search_document_splits_paths(self):
+        document = search_document('POST /api/v1/auth/otp/verify/', 'a@example.com')
+        self.assertIn('otp verify', document['A'])
+        self.assertIn('example.com', document['A'])
+
+    def test_q_parameter_filters_list(self):
+        """Test that q= matches terms across event, email and user agent."""
+        response = self.client.get(reverse('audit:audit-log-list'), {'q': 'verify curl'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['email'] for r in response.data['results']], ['a@example.com'])
+
+
+class AuditLogDetailCachingTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('a@example.com', 'password')
+        self.staff = User.objects.create_user('staff@example.com', 'password', is_staff=True)
+        self.log = AuditLog.objects.record('OTP_VERIFIED', 'a@example.com', '10.0.0.1')
+        self.url = reverse('audit:audit-log-detail', args=[self.log.pk])
+
+    def test_if_none_match_returns_304_without_queries(self):
+        """Test that a revalidation never touches the database."""
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_wildcard_if_none_match_requires_a_visible_row(self):
+        """Test that * is answered only after the row is found and allowed for the requester."""
+        other = User.objects.create_user('b@example.com', 'password')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='*').status_code, 404)
+        missing = reverse('audit:audit-log-detail', args=[self.log.pk + 1000])
+        self.client.force_authenticate(self.staff)
+        self.assertEqual(self.client.get(missing, HTTP_IF_NONE_MATCH='*').status_code, 404)
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='*').status_code, 304)
+
+    def test_etag_is_scoped_per_requester(self):
+        """Test that a user's validator is not valid for another requester."""
+        self.client.force_authenticate(self.user)
+        user_etag = self.client.get(self.url)['ETag']
+
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=user_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], user_etag)
+
+    def test_other_users_log_is_not_served_from_cache(self):
+        self.client.force_authenticate(self.staff)
+        self.client.get(self.url)
+
+        other = User.objects.create_user('b@example.com', 'password')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    @patch('apps.core.middleware.get_audit_spool')
+    def test_request_event_is_named_after_route(self, mock_get_audit_spool):
+        """Test that ids in the path do not create a new event name per object."""
+        other = User.objects.create_user('b@example.com', 'password')
+        self.client.force_authenticate(other)
+        self.client.get(self.url)
+
+        event = mock_get_audit_spool.return_value.submit.call_args[0][0]
+        self.assertEqual(event['event'], 'GET /api/v1/audit/logs/<int:pk>/')
+        self.assertEqual(event['meta']['request'], f'GET {self.url}')
+
+
+class AuditLogSparseFieldsTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user('staff@example.com', 'password', is_staff=True)
+        self.client.force_authenticate(self.staff)
+        self.log = AuditLog.objects.record('OTP_VERIFIED', 'a@example.com', '10.0.0.1', 'curl/8.0', {'a': 1})
+
+    def test_list_returns_requested_fields_only(self):
+        response = self.client.get(reverse('audit:audit-log-list'), {'fields': 'created_at,id,event'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data['results'][0]), ['id', 'event', 'created_at'])
+
+    def test_detail_returns_requested_fields_only(self):
+        url = reverse('audit:audit-log-detail', args=[self.log.pk])
+        full_etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, {'fields': 'id,formatted_metadata'})
+        self.assertEqual(response.data, {'id': self.log.pk, 'formatted_metadata': {'a': 1}})
+        self.assertNotEqual(response['ETag'], full_etag)
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse('audit:audit-log-list'), {'fields': 'id,password'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.data)
+
+
+class RecentActivityTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('a@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        self.url = reverse('audit:audit-recent-activity')
+
+    def tearDown(self):
+        # Executed on-commit callbacks cache lookup ids of rows the test rolls back.
+        AuditEvent.objects.clear_cache()
+        UserAgent.objects.clear_cache()
+
+    def record(self, event):
+        with self.captureOnCommitCallbacks(execute=True):
+            return AuditLog.objects.record(event, 'a@example.com', '10.0.0.1', 'curl/8.0')
+
+    def test_cold_read_falls_back_to_database_then_serves_from_cache(self):
+        """Test that a cold list is warmed from the DB and kept current by ingestion."""
+        self.record('OTP_REQUESTED')
+        AuditLog.objects.record('OTHER_USER', 'b@example.com')
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['source'], 'database')
+        self.assertEqual([r['event'] for r in response.data['results']], ['OTP_REQUESTED'])
+
+        newest = self.record('OTP_VERIFIED')
+        response = self.client.get(self.url, {'limit': 1})
+        self.assertEqual(response.data['source'], 'cache')
+        self.assertEqual(response.data['results'], [
+            dict(AuditLogSerializer(AuditLog.objects.get(pk=newest.pk)).data)
+        ])
+
+    def test_empty_activity_is_cached(self):
+        """Test that a user with no rows is not reloaded from the DB on every read."""
+        self.assertEqual(self.client.get(self.url).data['source'], 'database')
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual((response.data['source'], response.data['results']), ('cache', []))
+
+        self.record('OTP_REQUESTED')
+        response = self.client.get(self.url)
+        self.assertEqual([r['event'] for r in response.data['results']], ['OTP_REQUESTED'])
+
+    @override_settings(AUDIT_RECENT_ACTIVITY_SIZE=2)
+    def test_list_is_capped(self):
+        self.record('E1')
+        self.client.get(self.url)
+        self.record('E2')
+        self.record('E3')
+
+        response = self.client.get(self.url, {'limit': 10})
+        self.assertEqual([r['event'] for r in response.data['results']], ['E3', 'E2'])
+
+
+class ClusterRecentActivityTestCase(RecentActivityTestCase):
+    """
+    The recent-activity tests against a RedisCluster client. Commands go to the
+    configured Redis; like a real ClusterPipeline, a pipeline only supports
+    WATCH when opened with transaction=True.
+    """
+
+    def setUp(self):
+        super().setUp()
+        node = get_redis()
+
+        def pipeline(transaction=None, shard_hint=None):
+            if transaction:
+                return node.pipeline(transaction=True)
+            pipe = node.pipeline(transaction=False)
+            pipe.watch = MagicMock(side_effect=RedisClusterException('method watch() is not implemented'))
+            return pipe
+
+        cluster = MagicMock(spec=RedisCluster, wraps=node)
+        cluster.pipeline.side_effect = pipeline
+        patcher = patch('apps.audit.activity.get_redis', return_value=cluster)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cluster = cluster
+
+    def test_cluster_errors_fall_back_to_database(self):
+        self.record('OTP_REQUESTED')
+        self.cluster.lrange.side_effect = RedisClusterException('cluster is down')
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['source'], 'database')
+
+
+class AuditLogAdminTestCase(TestCase):
+
+    def setUp(self):
+        admin_user = User.objects.create_superuser('admin@example.com', 'password')
+        self.client.force_login(admin_user)
+        for event in ('OTP_REQUESTED', 'OTP_LOCKED', 'PROFILE_UPDATED'):
+            AuditLog.objects.record(event, 'a@example.com', '10.0.0.1')
+
+    def test_changelist_filters_by_category_and_range(self):
+        url = reverse('admin:audit_auditlog_changelist')
+        response = self.client.get(url, {'category': 'security', 'created': '24h'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([log.event.name for log in response.context['cl'].result_list], ['OTP_LOCKED'])
+
+    def test_paginator_count_is_bounded(self):
+        paginator = EstimatedCountPaginator(AuditLog.objects.filter(email='a@example.com'), 1)
+        paginator.count_limit = 1
+
+        self.assertEqual(paginator.count, 2)
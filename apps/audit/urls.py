@@ -7,4 +7,7 @@ app_name = 'audit'
 urlpatterns = [
     path('logs/', views.AuditLogListView.as_view(), name='audit-log-list'),
     path('logs/<int:pk>/', views.AuditLogDetailView.as_view(), name='audit-log-detail'),
+    path('recent/', views.RecentActivityView.as_view(), name='audit-recent-activity'),
+    path('spool/stats/', views.AuditSpoolStatsView.as_view(), name='audit-spool-stats'),
+    path('redis/stats/', views.RedisStatsView.as_view(), name='redis-stats'),
 ]
@@ -1,25 +1,45 @@
 
 import django_filters
-from django.db.models import Q
+from django.conf import settings
+from django.core.cache import cache
 from drf_spectacular.utils import extend_schema, OpenApiParameter
-from rest_framework import generics, permissions
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from apps.audit.activity import get_recent_activity
+from apps.audit.categories import filter_event_category
 from apps.audit.models import AuditLog
-from apps.audit.serializers import AuditLogSerializer, AuditLogDetailSerializer
+from apps.audit.network import filter_by_network, parse_network
+from apps.audit.search import search_queryset
+from apps.audit.serializers import AuditLogSerializer, AuditLogDetailSerializer, AuditLogRowSerializer
+from apps.core.conditional import if_none_match, make_etag
+from apps.core.db_router import ReplicaReadMixin
 from apps.core.filters import BaseFilterSet, OrderingFilter
 from apps.core.pagination import StandardResultsSetPagination
+from apps.core.rate_limits import rate_limit_breaker
+from apps.core.redis_client import pool_stats
+from apps.core.spool import get_audit_spool
 
 
 class AuditLogFilter(BaseFilterSet):
 
     email = django_filters.CharFilter(field_name='email', lookup_expr='icontains')
-    event = django_filters.CharFilter(field_name='event', lookup_expr='icontains')
+    event = django_filters.CharFilter(field_name='event__name', lookup_expr='icontains')
     ip_address = django_filters.CharFilter(field_name='ip_address', lookup_expr='icontains')
+    ip_cidr = django_filters.CharFilter(method='filter_ip_cidr')
 
     from_datetime = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='gte')
     to_datetime = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='lte')
 
     event_type = django_filters.CharFilter(method='filter_event_type')
 
+    q = django_filters.CharFilter(method='filter_search')
+
+    # Audit rows are append-only and carry no updated_at
+    updated_at = None
+    updated_at__lte = None
+
     metadata_key = django_filters.CharFilter(method='filter_metadata_key')
     metadata_value = django_filters.CharFilter(method='filter_metadata_value')
 
@@ -28,7 +48,7 @@ class AuditLogFilter(BaseFilterSet):
         fields=[
             ('created_at', 'created_at'),
             ('-created_at', '-created_at'),
-            ('event', 'event'),
+            ('event__name', 'event'),
             ('email', 'email'),
             ('ip_address', 'ip_address'),
         ]
@@ -37,10 +57,20 @@ class AuditLogFilter(BaseFilterSet):
     class Meta:
         model = AuditLog
         fields = [
-            'email', 'event', 'ip_address', 'from_datetime', 'to_datetime',
-            'event_type', 'metadata_key', 'metadata_value'
+            'email', 'event', 'ip_address', 'ip_cidr', 'from_datetime', 'to_datetime',
+            'event_type', 'metadata_key', 'metadata_value', 'q'
         ]
 
+    def filter_search(self, queryset, name, value):
+        return search_queryset(queryset, value)
+
+    def filter_ip_cidr(self, queryset, name, value):
+        try:
+            network = parse_network(value)
+        except ValueError:
+            raise ValidationError({'ip_cidr': 'Enter a valid network, e.g. 10.2.0.0/16'})
+        return filter_by_network(queryset, network)
+
     def filter_metadata_key(self, queryset, name, value):
         return queryset.filter(metadata__has_key=value)
 
@@ -48,44 +78,38 @@ class AuditLogFilter(BaseFilterSet):
         return queryset.filter(metadata__icontains=value)
 
     def filter_event_type(self, queryset, name, value):
-        value = value.lower()
-
-        if value == 'auth':
-            return queryset.filter(
-                Q(event__icontains='login') |
-                Q(event__icontains='logout') |
-                Q(event__icontains='token') |
-                Q(event__icontains='otp') |
-                Q(event__icontains='password')
-            )
-        elif value == 'user':
-            return queryset.filter(
-                Q(event__icontains='user') |
-                Q(event__icontains='profile') |
-                Q(event__icontains='register') |
-                Q(event__icontains='account')
-            )
-        elif value == 'security':
-            return queryset.filter(
-                Q(event__icontains='lock') |
-                Q(event__icontains='unlock') |
-                Q(event__icontains='failed') |
-                Q(event__icontains='suspicious')
-            )
-        elif value == 'admin':
-            return queryset.filter(
-                Q(event__icontains='admin') |
-                Q(event__icontains='staff') |
-                Q(event__icontains='permission')
-            )
-        elif value == 'system':
-            return queryset.filter(
-                Q(event__icontains='system') |
-                Q(event__icontains='cleanup') |
-                Q(event__icontains='maintenance')
-            )
+        return filter_event_category(queryset, value)
 
-        return queryset
+
+class SparseFieldsMixin:
+    """Parses the ``fields=`` query parameter against the serializer's allowed fields."""
+
+    def get_requested_fields(self):
+        if not hasattr(self, '_requested_fields'):
+            self._requested_fields = None
+            raw = self.request.query_params.get('fields')
+
+            if raw is not None:
+                allowed = self.get_serializer_class().Meta.fields
+                requested = {field.strip() for field in raw.split(',') if field.strip()}
+                unknown = sorted(requested - set(allowed))
+                if not requested or unknown:
+                    raise ValidationError({
+                        'fields': f"Unknown fields: {', '.join(unknown) or '(none given)'}. "
+                                  f"Allowed: {', '.join(allowed)}"
+                    })
+                # Keep the serializer's field order so output and cache keys are stable.
+                self._requested_fields = [field for field in allowed if field in requested]
+
+        return self._requested_fields
+
+
+FIELDS_PARAMETER = OpenApiParameter(
+    name='fields',
+    type=str,
+    description='Comma-separated subset of fields to return, e.g. id,event,created_at',
+    required=False
+)
 
 
 @extend_schema(
@@ -110,6 +134,12 @@ class AuditLogFilter(BaseFilterSet):
             description='Filter by IP address (partial match)',
             required=False
         ),
+        OpenApiParameter(
+            name='ip_cidr',
+            type=str,
+            description='Filter by subnet in CIDR notation, e.g. 10.2.0.0/16 or 2001:db8::/32',
+            required=False
+        ),
         OpenApiParameter(
             name='from_datetime',
             type={'type': 'string', 'format': 'date-time'},
@@ -141,21 +171,28 @@ class AuditLogFilter(BaseFilterSet):
             description='Filter by metadata value content (partial match)',
             required=False
         ),
+        OpenApiParameter(
+            name='q',
+            type=str,
+            description='Full-text search over event, email, user agent and request metadata. Results are ranked by relevance unless ordering is given.',
+            required=False
+        ),
         OpenApiParameter(
             name='ordering',
             type=str,
             description='Order by: created_at, -created_at, event, email, ip_address',
             required=False
         ),
+        FIELDS_PARAMETER,
     ],
     responses={
         200: AuditLogSerializer(many=True),
         401: "Unauthorized - JWT token required"
     }
 )
-class AuditLogListView(generics.ListAPIView):
+class AuditLogListView(ReplicaReadMixin, SparseFieldsMixin, generics.ListAPIView):
 
-    queryset = AuditLog.objects.all()
+    queryset = AuditLog.objects.select_related('event', 'user_agent')
     serializer_class = AuditLogSerializer
     permission_classes = [permissions.IsAuthenticated]
     filterset_class = AuditLogFilter
@@ -171,26 +208,165 @@ class AuditLogListView(generics.ListAPIView):
 
         return queryset
 
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+
+        # Only a full-text search annotates rank; a blank q or the fallback does not.
+        if 'rank' in queryset.query.annotations and 'ordering' not in self.request.query_params:
+            queryset = queryset.order_by('-rank', '-created_at')
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        row_serializer = AuditLogRowSerializer(self.get_requested_fields())
+        queryset = row_serializer.rows(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(row_serializer.serialize(page))
+        return Response(row_serializer.serialize(queryset))
+
 
 @extend_schema(
     summary="Get Audit Log Detail",
     description="Retrieve detailed information about a specific audit log entry. Requires JWT authentication. Non-admin users can only access their own logs.",
+    parameters=[FIELDS_PARAMETER],
     responses={
         200: AuditLogDetailSerializer,
+        304: "Not Modified - If-None-Match matched the current ETag",
         401: "Unauthorized - JWT token required",
         404: "Audit log not found"
     }
 )
-class AuditLogDetailView(generics.RetrieveAPIView):
+class AuditLogDetailView(ReplicaReadMixin, SparseFieldsMixin, generics.RetrieveAPIView):
+    """
+    Audit rows never change after insert, so the ETag is derived from the id
+    and the requester's scope alone: a matching If-None-Match is answered with
+    304 without touching the audit table (``*`` only once the row has been
+    found and is visible to the requester). Serialized payloads are cached per
+    scope so staff and non-staff representations never mix.
+
+    Rows are archived after AUDIT_ARCHIVE_AFTER_DAYS and their ids then 404,
+    so clients may cache a representation for AUDIT_DETAIL_MAX_AGE only.
+    """
 
-    queryset = AuditLog.objects.all()
+    queryset = AuditLog.objects.select_related('event', 'user_agent')
     serializer_class = AuditLogDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    # Bump when AuditLogDetailSerializer output changes to invalidate ETags and cached payloads.
+    REPRESENTATION_VERSION = 1
+
     def get_queryset(self):
         queryset = super().get_queryset()
+        fields = self.get_requested_fields()
+
+        if fields is not None:
+            columns = {c for field in fields for c in self.serializer_class.model_columns[field]}
+            queryset = (
+                queryset.select_related(None)
+                .select_related(*(relation for relation in ('event', 'user_agent') if relation in columns))
+                .only(*columns)
+            )
 
         if not self.request.user.is_staff:
             queryset = queryset.filter(email=self.request.user.email)
 
         return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def _cache_scope(self):
+        user = self.request.user
+        return 'staff' if user.is_staff else f'user:{user.pk}'
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_field]
+        scope = self._cache_scope()
+        fieldset = ','.join(self.get_requested_fields() or ['*'])
+        etag = make_etag('audit-log', pk, scope, fieldset, self.REPRESENTATION_VERSION)
+        headers = {
+            'ETag': etag,
+            'Cache-Control': f'private, max-age={settings.AUDIT_DETAIL_MAX_AGE}, immutable',
+            'Vary': 'Authorization',
+        }
+
+        if if_none_match(request, etag, wildcard=False):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        cache_key = f'audit:detail:v{self.REPRESENTATION_VERSION}:{scope}:{pk}:{fieldset}'
+        data = cache.get(cache_key)
+        if data is None:
+            data = dict(self.get_serializer(self.get_object()).data)
+            cache.set(cache_key, data, timeout=settings.AUDIT_DETAIL_CACHE_TIMEOUT)
+
+        if if_none_match(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(data, headers=headers)
+
+
+@extend_schema(
+    summary="Recent Activity",
+    description="The authenticated user's latest audit events, newest first, served from a per-user Redis list.",
+    parameters=[
+        OpenApiParameter(
+            name='limit',
+            type=int,
+            description='Number of events to return (default 20, max AUDIT_RECENT_ACTIVITY_SIZE)',
+            required=False
+        ),
+    ],
+    responses={
+        200: AuditLogSerializer(many=True),
+        401: "Unauthorized - JWT token required"
+    }
+)
+class RecentActivityView(ReplicaReadMixin, APIView):
+
+    permission_classes = [permissions.IsAuthenticated]
+    default_limit = 20
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            raise ValidationError({'limit': 'Must be an integer'})
+        limit = max(1, min(limit, settings.AUDIT_RECENT_ACTIVITY_SIZE))
+
+        results, source = get_recent_activity(request.user.email, limit)
+        return Response({'results': results, 'source': source})
+
+
+@extend_schema(
+    summary="Audit Spool Stats",
+    description="Counters for the audit event spool of the serving process (queued, published, spooled, replayed, dropped). Staff only.",
+    responses={
+        200: {"type": "object"},
+        401: "Unauthorized - JWT token required",
+        403: "Forbidden - staff only"
+    }
+)
+class AuditSpoolStatsView(APIView):
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(get_audit_spool().stats())
+
+
+@extend_schema(
+    summary="Redis Stats",
+    description="Redis state of the serving process: connection pool counters (max_connections, created, in_use, idle, waits) for sizing REDIS_POOL_MAX_CONNECTIONS, and the rate limiter circuit breaker (state, transition counts, short-circuited calls). Staff only.",
+    responses={
+        200: {"type": "object"},
+        401: "Unauthorized - JWT token required",
+        403: "Forbidden - staff only"
+    }
+)
+class RedisStatsView(APIView):
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({'pools': pool_stats(), 'rate_limit_breaker': rate_limit_breaker.stats()})
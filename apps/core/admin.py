@@ -1,3 +1,16 @@
 from django.contrib import admin
+from apps.core.models import OutboxMessage
 
-# Register your models here.
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+
+    list_display = ('id', 'kind', 'status', 'attempts', 'available_at', 'dispatched_at')
+    list_filter = ('kind', 'status')
+    # The payload can hold personal data; it is never shown in the admin.
+    exclude = ('payload',)
+    readonly_fields = ('kind', 'status', 'attempts', 'available_at', 'dispatched_at', 'last_error', 'created_at')
+    ordering = ('-id',)
+
+    def has_add_permission(self, request):
+        return False
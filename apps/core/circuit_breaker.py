@@ -0,0 +1,96 @@
+"""
+Circuit breaker for calls to a shared dependency (Redis).
+
+After failure_threshold consecutive failures the breaker opens and callers
+skip the dependency for reset_timeout seconds instead of each waiting for a
+socket timeout. It then lets a single trial call through (half-open): success
+closes it, failure opens it again. State changes are logged and counted.
+"""
+import threading
+import time
+from apps.core.logger import system_logger
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+
+    def __init__(self, name, failure_threshold, reset_timeout):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._transitions = {OPEN: 0, HALF_OPEN: 0, CLOSED: 0}
+        self._short_circuited = 0
+
+    @property
+    def state(self):
+        return self._state
+
+    def _transition(self, state, reason=''):
+        self._state = state
+        self._transitions[state] += 1
+        message = f"Circuit breaker '{self.name}' {state}" + (f": {reason}" if reason else '')
+        if state == OPEN:
+            system_logger.warning(message)
+        else:
+            system_logger.info(message)
+
+    def allow(self):
+        """Whether the caller may use the dependency now; False means use the fallback."""
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._transition(HALF_OPEN)
+                self._trial_in_flight = False
+
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+
+            self._short_circuited += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._state != CLOSED:
+                self._trial_in_flight = False
+                self._transition(CLOSED)
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+                self._transition(OPEN, str(error or ''))
+
+    def release(self):
+        """End a half-open trial without a verdict, e.g. when the call failed for an unrelated reason."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def retry_after(self):
+        """Seconds until the next trial call, 0 unless open."""
+        if self._state != OPEN:
+            return 0
+        return max(0, int(self._opened_at + self.reset_timeout - time.monotonic()))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'opened': self._transitions[OPEN],
+                'half_opened': self._transitions[HALF_OPEN],
+                'closed': self._transitions[CLOSED],
+                'short_circuited': self._short_circuited,
+            }
@@ -0,0 +1,42 @@
+import hashlib
+import hmac
+from django.conf import settings
+from django.utils.http import parse_etags, quote_etag
+
+
+def make_etag(*parts):
+    """
+    Strong ETag over the given parts, keyed with SECRET_KEY so clients cannot
+    forge a validator for a representation they were never served.
+    """
+    message = ':'.join(str(part) for part in parts).encode()
+    digest = hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+    return quote_etag(digest[:32])
+
+
+def _strip_weak(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def if_none_match(request, etag, wildcard=True):
+    """
+    True if the client's cached copy is current (weak comparison, RFC 9110 13.1.2).
+    ``*`` only asserts that the resource exists; pass wildcard=False when that
+    has not been checked yet.
+    """
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return (wildcard and '*' in etags) or _strip_weak(etag) in {_strip_weak(e) for e in etags}
+
+
+def if_match_failed(request, etag):
+    """True if an If-Match precondition is present and does not match (strong comparison)."""
+    header = request.META.get('HTTP_IF_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    if '*' in etags:
+        return False
+    return etag not in {e for e in etags if not e.startswith('W/')}
@@ -0,0 +1,108 @@
+"""
+Primary/replica database routing with read-your-writes stickiness.
+
+Everything reads from and writes to ``default`` unless a view opts in with
+ReplicaReadMixin: its safe-method requests then read audit and account models
+from the ``replica`` alias (when configured). A request that writes pins the
+client to the primary for DB_REPLICA_PIN_SECONDS, both through a signed
+cookie and, for token clients without cookies, a per-user cache entry, so
+its next reads cannot observe replica lag.
+"""
+import contextvars
+import time
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA_ALIAS = 'replica'
+REPLICA_APP_LABELS = {'audit', 'accounts'}
+PIN_COOKIE = 'db_primary_until'
+
+
+class RoutingState:
+    __slots__ = ('use_replica', 'wrote')
+
+    def __init__(self):
+        self.use_replica = False
+        self.wrote = False
+
+
+_state = contextvars.ContextVar('db_routing_state', default=None)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def begin_request():
+    """Start per-request routing state; returns a token for end_request()."""
+    state = RoutingState()
+    return state, _state.set(state)
+
+
+def end_request(token):
+    _state.reset(token)
+
+
+def _user_pin_key(user_id):
+    return f'db_pin:user:{user_id}'
+
+
+def is_pinned(request):
+    try:
+        until = float(request.get_signed_cookie(PIN_COOKIE, default=0, salt=PIN_COOKIE))
+    except ValueError:
+        until = 0
+    if until > time.time():
+        return True
+
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_authenticated and cache.get(_user_pin_key(user.pk)))
+
+
+def pin_to_primary(request, response):
+    seconds = settings.DB_REPLICA_PIN_SECONDS
+    response.set_signed_cookie(
+        PIN_COOKIE, str(time.time() + seconds), salt=PIN_COOKIE,
+        max_age=seconds, httponly=True, samesite='Lax',
+    )
+
+    user = getattr(request, 'user', None)
+    if user and user.is_authenticated:
+        cache.set(_user_pin_key(user.pk), 1, timeout=seconds)
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (state is not None and state.use_replica and replica_configured()
+                and model._meta.app_label in REPLICA_APP_LABELS):
+            return REPLICA_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+            # Reads after a write in the same request must see it.
+            state.use_replica = False
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of the primary, so objects from either may relate.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaReadMixin:
+    """DRF view mixin: serve safe-method requests from the replica unless the client is pinned."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        state = _state.get()
+        if state is not None and request.method in SAFE_METHODS and not is_pinned(request):
+            state.use_replica = True
@@ -0,0 +1,70 @@
+import smtplib
+import time
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from apps.core.logger import system_logger
+
+# One SMTP connection per worker process, reused across tasks so the
+# TLS handshake is paid once instead of once per message.
+_connection = None
+_connection_opened_at = 0.0
+
+
+def get_mail_connection():
+    global _connection, _connection_opened_at
+
+    max_age = getattr(settings, 'EMAIL_CONNECTION_MAX_AGE', 300)
+    if _connection is not None and time.monotonic() - _connection_opened_at > max_age:
+        close_mail_connection()
+
+    if _connection is None:
+        _connection = get_connection(fail_silently=False)
+        _connection.open()
+        _connection_opened_at = time.monotonic()
+
+    return _connection
+
+
+def close_mail_connection():
+    global _connection
+
+    if _connection is None:
+        return
+    try:
+        _connection.close()
+    except Exception as e:
+        system_logger.warning(f"Failed to close mail connection: {str(e)}")
+    _connection = None
+
+
+def build_message(subject, message, recipient_list, from_email=None):
+    return EmailMessage(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=recipient_list,
+    )
+
+
+def send_message(message):
+    """
+    Send a single message over the persistent connection, reconnecting once
+    if the server has dropped it.
+    """
+    try:
+        return get_mail_connection().send_messages([message]) or 0
+    except (smtplib.SMTPException, OSError) as e:
+        system_logger.warning(f"Mail connection failed, reconnecting: {str(e)}")
+        close_mail_connection()
+        return get_mail_connection().send_messages([message]) or 0
+
+
+def send_messages(messages):
+    """
+    Send messages one by one over a single connection so that a reconnect
+    never re-sends messages that were already delivered.
+    """
+    sent = 0
+    for message in messages:
+        sent += send_message(message)
+    return sent
@@ -0,0 +1,52 @@
+import time
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from apps.core.mail import build_message, close_mail_connection, send_messages
+
+
+class Command(BaseCommand):
+    help = 'Benchmark email throughput: a new connection per message vs. one reused connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=200, help='Messages to send per run')
+        parser.add_argument(
+            '--backend',
+            default='django.core.mail.backends.locmem.EmailBackend',
+            help='Email backend to benchmark (use the SMTP backend against a local debugging server)'
+        )
+        parser.add_argument('--host', default=None, help='SMTP host override')
+        parser.add_argument('--port', type=int, default=None, help='SMTP port override')
+        parser.add_argument('--no-tls', action='store_true', help='Disable STARTTLS (for local debugging servers)')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        overrides = {'EMAIL_BACKEND': options['backend']}
+        if options['host']:
+            overrides['EMAIL_HOST'] = options['host']
+        if options['port']:
+            overrides['EMAIL_PORT'] = options['port']
+        if options['no_tls']:
+            overrides['EMAIL_USE_TLS'] = False
+
+        with override_settings(**overrides):
+            messages = [
+                build_message('Benchmark', f'Message {i}', [f'bench{i}@example.com'])
+                for i in range(count)
+            ]
+
+            start = time.perf_counter()
+            for message in messages:
+                get_connection(fail_silently=False).send_messages([message])
+            per_message = time.perf_counter() - start
+
+            close_mail_connection()
+            start = time.perf_counter()
+            send_messages(messages)
+            reused = time.perf_counter() - start
+            close_mail_connection()
+
+        self.stdout.write(f'Backend: {options["backend"]}')
+        self.stdout.write(f'Connection per message: {count / per_message:,.0f} msg/s')
+        self.stdout.write(f'Reused connection:      {count / reused:,.0f} msg/s')
+        self.stdout.write(self.style.SUCCESS(f'Speedup: {per_message / reused:.1f}x'))
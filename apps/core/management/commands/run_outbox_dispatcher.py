@@ -0,0 +1,31 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.core.outbox import dispatch_batch
+
+
+class Command(BaseCommand):
+    help = 'Continuously hand outbox messages to Celery. Safe to run several instances side by side.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE, help='Rows claimed per batch')
+        parser.add_argument('--interval', type=float, default=settings.OUTBOX_DISPATCH_INTERVAL, help='Idle sleep in seconds')
+        parser.add_argument('--once', action='store_true', help='Drain the outbox once and exit')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        while True:
+            dispatched = 0
+            while True:
+                claimed = dispatch_batch(batch_size)
+                dispatched += claimed
+                if claimed < batch_size:
+                    break
+
+            if dispatched:
+                self.stdout.write(f'Dispatched {dispatched} outbox messages')
+
+            if options['once']:
+                return
+            time.sleep(options['interval'])
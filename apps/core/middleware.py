@@ -3,6 +3,9 @@ import uuid
 import time
 from django.utils.deprecation import MiddlewareMixin
 from apps.core.logger import system_logger, audit_logger
+from apps.core.audit_policy import get_audit_policy
+from apps.core.db_router import begin_request, end_request, pin_to_primary
+from apps.core.spool import get_audit_spool
 from apps.audit.models import AuditLog
 
 
@@ -48,15 +51,35 @@ class RequestLoggingMiddleware(MiddlewareMixin):
         return ip
 
 
+class DatabaseRoutingMiddleware(MiddlewareMixin):
+    """
+    Tracks per-request database routing (see apps.core.db_router) and pins
+    the client to the primary after a request that wrote.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state, token = begin_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+
+        if state.wrote:
+            pin_to_primary(request, response)
+        return response
+
+
 class AuditLogMiddleware(MiddlewareMixin):
     """
     Middleware to create audit logs for sensitive operations.
+
+    Each request produces at most one audit record: the view's explicit event
+    (see record_audit_event) enriched with request details if there is one,
+    otherwise a generic record when settings.AUDIT_POLICY says so.
     """
-    AUDIT_PATHS = [
-        '/api/accounts/',
-        '/api/auth/',
-        '/admin/',
-    ]
 
     def __init__(self, get_response):
         self.get_response = get_response
@@ -64,34 +87,58 @@ class AuditLogMiddleware(MiddlewareMixin):
     def __call__(self, request):
         response = self.get_response(request)
 
-        if self._should_audit(request):
-            self._create_audit_log(request, response)
+        explicit_event = getattr(request, 'audit_event', None)
+        if explicit_event is not None:
+            self._create_audit_log(request, response, explicit_event)
+        else:
+            record, sample_rate = get_audit_policy().should_record(
+                request.method, request.path, response.status_code
+            )
+            if record:
+                self._create_audit_log(request, response, sample_rate=sample_rate)
 
         return response
 
-    def _should_audit(self, request):
-        path = request.path
-        return any(audit_path in path for audit_path in self.AUDIT_PATHS)
-
-    def _create_audit_log(self, request, response):
+    def _create_audit_log(self, request, response, explicit_event=None, sample_rate=1.0):
         try:
-            from apps.core.tasks import write_audit_log
-
-            user_email = request.user.email if request.user.is_authenticated else 'anonymous'
-
-            write_audit_log.delay(
-                event=f"{request.method} {request.path}",
-                email=user_email,
-                ip=self._get_client_ip(request),
-                meta={
-                    'status_code': response.status_code,
-                    'user_agent': request.META.get('HTTP_USER_AGENT', ''),
-                    'referer': request.META.get('HTTP_REFERER', ''),
+            meta = {
+                'status_code': response.status_code,
+                'user_agent': request.META.get('HTTP_USER_AGENT', ''),
+                'referer': request.META.get('HTTP_REFERER', ''),
+            }
+            if sample_rate < 1.0:
+                meta['sample_rate'] = sample_rate
+
+            meta['request'] = f"{request.method} {request.path}"
+
+            if explicit_event is not None:
+                event = dict(explicit_event)
+                event['ip'] = event['ip'] or self._get_client_ip(request)
+                event['meta'] = {**meta, **event['meta']}
+            else:
+                user_email = request.user.email if request.user.is_authenticated else 'anonymous'
+                event = {
+                    'event': self._event_name(request),
+                    'email': user_email,
+                    'ip': self._get_client_ip(request),
+                    'meta': meta,
                 }
-            )
+
+            # Never talk to the broker on the request path; the spool publishes
+            # in the background and journals events while the broker is down.
+            get_audit_spool().submit(event)
         except Exception as e:
             audit_logger.error(f"Failed to write audit log: {str(e)}")
 
+    def _event_name(self, request):
+        """
+        Name generic events after the URL pattern, not the path: event names
+        are interned, and paths carry ids. The actual path stays in meta.
+        """
+        match = request.resolver_match
+        route = f"/{match.route}" if match is not None else '<unresolved>'
+        return f"{request.method} {route}"
+
     def _get_client_ip(self, request):
         """Get the client's IP address."""
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
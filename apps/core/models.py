@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 class TimeStampedModel(models.Model):
 
@@ -7,3 +8,47 @@ class TimeStampedModel(models.Model):
 
     class Meta:
         abstract = True
+
+class OutboxMessage(TimeStampedModel):
+    """
+    Outgoing work written in the same transaction as the change that causes
+    it, and handed to Celery by the outbox dispatcher after commit.
+    """
+    KIND_EMAIL = 'email'
+    KIND_EMAIL_BATCH = 'email_batch'
+    KIND_OTP_EMAIL = 'otp_email'
+    KIND_CHOICES = [
+        (KIND_EMAIL, 'Email'),
+        (KIND_EMAIL_BATCH, 'Email batch'),
+        (KIND_OTP_EMAIL, 'OTP email'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_CLAIMED = 'claimed'
+    STATUS_DISPATCHED = 'dispatched'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_CLAIMED, 'Claimed'),
+        (STATUS_DISPATCHED, 'Dispatched'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    dispatched_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Outbox Message'
+        verbose_name_plural = 'Outbox Messages'
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='core_outbox_status_avail_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} - {self.status} - {self.created_at}"
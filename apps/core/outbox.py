@@ -0,0 +1,186 @@
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from apps.core.logger import system_logger
+from apps.core.models import OutboxMessage
+
+
+def enqueue(kind, payload):
+    """
+    Record outgoing work. Call inside the caller's transaction so a rollback
+    discards it together with the change that produced it.
+    """
+    return OutboxMessage.objects.create(kind=kind, payload=payload)
+
+
+def enqueue_email(subject, message, recipient_list, from_email=None):
+    return enqueue(OutboxMessage.KIND_EMAIL, {
+        'subject': subject,
+        'message': message,
+        'recipient_list': list(recipient_list),
+        'from_email': from_email,
+    })
+
+
+def enqueue_email_batch(messages):
+    """One outbox row for many emails, published as a single bulk email task."""
+    return enqueue(OutboxMessage.KIND_EMAIL_BATCH, {
+        'messages': [
+            {
+                'subject': message['subject'],
+                'message': message['message'],
+                'recipient_list': list(message['recipient_list']),
+                'from_email': message.get('from_email'),
+            }
+            for message in messages
+        ],
+    })
+
+
+def enqueue_otp_email(email, expires_in=None):
+    """
+    The code itself is not stored here: the task sends whatever OTP is
+    current in the cache, so it never sits in the outbox or the broker.
+    """
+    if expires_in is None:
+        expires_in = settings.OTP_EXPIRY_SECONDS
+    expires_at = timezone.now() + timedelta(seconds=expires_in)
+    return enqueue(OutboxMessage.KIND_OTP_EMAIL, {
+        'email': email,
+        'expires_at': expires_at.isoformat(),
+    })
+
+
+def claim_batch(batch_size):
+    """
+    Claim up to batch_size due messages. Rows locked by another dispatcher are
+    skipped, and claimed rows are leased by pushing available_at forward so a
+    crashed dispatcher's rows become claimable again once the lease expires.
+    """
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=settings.OUTBOX_CLAIM_LEASE)
+
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                status__in=[OutboxMessage.STATUS_PENDING, OutboxMessage.STATUS_CLAIMED],
+                available_at__lte=now,
+            )
+            .order_by('id')[:batch_size]
+        )
+        if messages:
+            OutboxMessage.objects.filter(pk__in=[m.pk for m in messages]).update(
+                status=OutboxMessage.STATUS_CLAIMED,
+                available_at=lease_until,
+                updated_at=now,
+            )
+    return messages
+
+
+def _finish(messages, status, error=''):
+    """Record the outcome of messages at once, so a later failure in the batch cannot release them."""
+    now = timezone.now()
+    fields = {'status': status, 'updated_at': now}
+    if status == OutboxMessage.STATUS_DISPATCHED:
+        fields['dispatched_at'] = now
+    if error:
+        fields['last_error'] = error
+    OutboxMessage.objects.filter(pk__in=[m.pk for m in messages]).update(**fields)
+    for message in messages:
+        message.status = status
+
+
+def _hand_off(messages):
+    """
+    Publish messages to Celery, marking each one dispatched (or dropped) as
+    soon as its publish succeeds. Returns the number of OTP emails dropped.
+    """
+    from apps.core.tasks import send_bulk_email_task, send_otp_email
+
+    email_messages = [
+        m for m in messages
+        if m.kind in (OutboxMessage.KIND_EMAIL, OutboxMessage.KIND_EMAIL_BATCH)
+    ]
+    if email_messages:
+        emails = []
+        for message in email_messages:
+            if message.kind == OutboxMessage.KIND_EMAIL:
+                emails.append(message.payload)
+            else:
+                emails.extend(message.payload['messages'])
+        send_bulk_email_task.delay(emails)
+        _finish(email_messages, OutboxMessage.STATUS_DISPATCHED)
+
+    dropped = 0
+    latest_otp = {}
+    for message in messages:
+        if message.kind == OutboxMessage.KIND_OTP_EMAIL:
+            previous = latest_otp.get(message.payload['email'])
+            if previous is not None:
+                _finish([previous], OutboxMessage.STATUS_FAILED, 'Superseded by a newer OTP')
+                dropped += 1
+            latest_otp[message.payload['email']] = message
+
+    now = timezone.now()
+    for message in latest_otp.values():
+        # A stale code is useless to the user; drop it rather than send it late.
+        # The worker also discards the task if it is still queued at expiry.
+        expires_at = datetime.fromisoformat(message.payload['expires_at'])
+        if expires_at <= now:
+            _finish([message], OutboxMessage.STATUS_FAILED, 'OTP expired before dispatch')
+            dropped += 1
+            continue
+        send_otp_email.apply_async((message.payload['email'],), expires=expires_at)
+        _finish([message], OutboxMessage.STATUS_DISPATCHED)
+    return dropped
+
+
+def _release(messages, error):
+    now = timezone.now()
+    for message in messages:
+        message.attempts += 1
+        message.last_error = str(error)
+        message.updated_at = now
+        if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            message.status = OutboxMessage.STATUS_FAILED
+        else:
+            message.status = OutboxMessage.STATUS_PENDING
+            message.available_at = now + timedelta(seconds=2 ** message.attempts)
+    OutboxMessage.objects.bulk_update(
+        messages, ['attempts', 'last_error', 'status', 'available_at', 'updated_at']
+    )
+
+
+def dispatch_batch(batch_size=None):
+    """Claim one batch and hand it to Celery. Returns the number of messages claimed."""
+    messages = claim_batch(batch_size or settings.OUTBOX_BATCH_SIZE)
+    if not messages:
+        return 0
+
+    try:
+        dropped = _hand_off(messages)
+    except Exception as e:
+        # Only what was not published yet goes back; the rest is already with Celery.
+        unpublished = [
+            m for m in messages
+            if m.status not in (OutboxMessage.STATUS_DISPATCHED, OutboxMessage.STATUS_FAILED)
+        ]
+        system_logger.error(f"Outbox dispatch failed for {len(unpublished)} messages: {str(e)}")
+        _release(unpublished, e)
+        return len(messages)
+
+    if dropped:
+        system_logger.info(f"Dropped {dropped} stale OTP emails from the outbox")
+    return len(messages)
+
+
+def purge_dispatched(older_than_seconds):
+    cutoff = timezone.now() - timedelta(seconds=older_than_seconds)
+    deleted, _ = OutboxMessage.objects.filter(
+        status=OutboxMessage.STATUS_DISPATCHED,
+        dispatched_at__lt=cutoff,
+    ).delete()
+    return deleted
@@ -1,4 +1,7 @@
 
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 
@@ -28,3 +31,30 @@ class LargeResultsSetPagination(StandardResultsSetPagination):
 class SmallResultsSetPagination(StandardResultsSetPagination):
     page_size = 10
     max_page_size = 50
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Admin paginator for very large tables. Unfiltered lists use the planner's
+    row estimate on PostgreSQL; otherwise at most count_limit + 1 rows are
+    counted, so pages past the limit are not linked but no count scans the table.
+    """
+
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+
+        if not queryset.query.where and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] > self.count_limit:
+                return int(row[0])
+
+        return queryset[:self.count_limit + 1].count()
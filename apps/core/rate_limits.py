@@ -1,10 +1,15 @@
 
+import functools
+import threading
 import time
+from collections import OrderedDict, deque
 from django.conf import settings
-from django.core.cache import cache
 from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
+from redis.exceptions import RedisError
 from rest_framework import status
+from apps.core.circuit_breaker import CircuitBreaker
+from apps.core.redis_client import get_redis
 from apps.core.status_codes import ErrorResponses
 
 
@@ -12,15 +17,150 @@ class RateLimitExceeded(Exception):
     pass
 
 
+class LocalRateLimiter:
+    """
+    In-process stand-in for RedisRateLimiter while Redis is unavailable.
+
+    Windows and counters are per process, so across N workers a client can
+    get up to N times the configured rate: approximate, but still bounded.
+    Policies listed in RATE_LIMIT_FAIL_CLOSED refuse every request instead.
+    """
+
+    max_keys = 10000
+
+    def __init__(self, breaker):
+        self.breaker = breaker
+        self._lock = threading.Lock()
+        self._windows = OrderedDict()
+        self._values = OrderedDict()
+
+    def _remember(self, store, key, value):
+        store[key] = value
+        store.move_to_end(key)
+        if len(store) > self.max_keys:
+            store.popitem(last=False)
+
+    def _window(self, key, window_seconds):
+        hits = self._windows.get(key)
+        if hits is None:
+            hits = deque()
+        self._remember(self._windows, key, hits)
+
+        window_start = time.time() - window_seconds
+        while hits and hits[0] <= window_start:
+            hits.popleft()
+        return hits
+
+    def is_rate_limited(self, key, max_requests, window_seconds, policy=None):
+        if policy in settings.RATE_LIMIT_FAIL_CLOSED:
+            return True
+
+        with self._lock:
+            hits = self._window(key, window_seconds)
+            if len(hits) >= max_requests:
+                return True
+            hits.append(time.time())
+            return False
+
+    def add_request(self, key, window_seconds):
+        with self._lock:
+            self._window(key, window_seconds).append(time.time())
+
+    def get_remaining_requests(self, key, max_requests, window_seconds):
+        with self._lock:
+            return max(0, max_requests - len(self._window(key, window_seconds)))
+
+    def get_reset_time(self, key, window_seconds):
+        with self._lock:
+            hits = self._windows.get(key)
+            if hits:
+                return max(0, int(hits[0] + window_seconds - time.time()))
+        # Nothing recorded here: the request was refused because Redis is
+        # down, so retry once the breaker next tries Redis.
+        return self.breaker.retry_after()
+
+    def _get(self, key):
+        item = self._values.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            del self._values[key]
+            return None
+        return value
+
+    def get(self, key):
+        with self._lock:
+            return self._get(key)
+
+    def increment_counter(self, key, expire_seconds=None):
+        with self._lock:
+            value = int(self._get(key) or 0) + 1
+            if value == 1:
+                expires_at = time.time() + expire_seconds if expire_seconds else None
+            else:
+                expires_at = self._values[key][1]
+            self._remember(self._values, key, (value, expires_at))
+            return value
+
+    def get_counter(self, key):
+        with self._lock:
+            return int(self._get(key) or 0)
+
+    def reset_counter(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._values.pop(key, None)
+                self._windows.pop(key, None)
+
+    def set_with_expiry(self, key, value, expire_seconds):
+        with self._lock:
+            self._remember(self._values, key, (value, time.time() + expire_seconds))
+        return True
+
+
+rate_limit_breaker = CircuitBreaker(
+    'rate_limiter', settings.RATE_LIMIT_BREAKER_FAILURES, settings.RATE_LIMIT_BREAKER_RESET_SECONDS
+)
+local_rate_limiter = LocalRateLimiter(rate_limit_breaker)
+
+
+def _with_breaker(method):
+    """Run method against Redis unless the breaker is open or the call fails; then use the local limiter."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.breaker.allow():
+            try:
+                result = method(self, *args, **kwargs)
+            except RedisError as e:
+                self.breaker.record_failure(e)
+            except BaseException:
+                # Says nothing about Redis, but a half-open trial must not stay claimed forever.
+                self.breaker.release()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+        return getattr(self.fallback, method.__name__)(*args, **kwargs)
+    return wrapper
+
+
 class RedisRateLimiter:
     """
     Redis-based rate limiter using sliding window algorithm and atomic counters.
+
+    Every call goes through a circuit breaker shared by the process: when
+    Redis fails or stalls, calls fall back to LocalRateLimiter instead of
+    raising or each waiting for a socket timeout.
     """
 
-    def __init__(self, redis_client=None):
-        self.redis = redis_client or cache._cache.get_client()
+    def __init__(self, redis_client=None, breaker=None, fallback=None):
+        self.redis = redis_client or get_redis()
+        self.breaker = breaker or rate_limit_breaker
+        self.fallback = fallback or local_rate_limiter
 
-    def is_rate_limited(self, key, max_requests, window_seconds):
+    @_with_breaker
+    def is_rate_limited(self, key, max_requests, window_seconds, policy=None):
       
         current_time = time.time()
         window_start = current_time - window_seconds
@@ -38,6 +178,19 @@ class RedisRateLimiter:
 
         return False
 
+    @_with_breaker
+    def add_request(self, key, window_seconds):
+
+        current_time = time.time()
+        self.redis.zadd(key, {current_time: current_time})
+        self.redis.expire(key, window_seconds * 2)
+
+    @_with_breaker
+    def get(self, key):
+
+        return self.redis.get(key)
+
+    @_with_breaker
     def get_remaining_requests(self, key, max_requests, window_seconds):
 
         current_time = time.time()
@@ -49,6 +202,7 @@ class RedisRateLimiter:
 
         return max(0, max_requests - request_count)
 
+    @_with_breaker
     def get_reset_time(self, key, window_seconds):
 
         oldest_timestamp = self.redis.zrange(key, 0, 0, withscores=True)
@@ -57,6 +211,7 @@ class RedisRateLimiter:
             return max(0, int(reset_time))
         return 0
 
+    @_with_breaker
     def increment_counter(self, key, expire_seconds=None):
 
         new_value = self.redis.incr(key)
@@ -66,15 +221,18 @@ class RedisRateLimiter:
 
         return new_value
 
+    @_with_breaker
     def get_counter(self, key):
 
         value = self.redis.get(key)
         return int(value) if value else 0
 
-    def reset_counter(self, key):
+    @_with_breaker
+    def reset_counter(self, *keys):
 
-        self.redis.delete(key)
+        self.redis.delete(*keys)
 
+    @_with_breaker
     def set_with_expiry(self, key, value, expire_seconds):
 
         return self.redis.setex(key, expire_seconds, value)
@@ -89,6 +247,7 @@ class RateLimitMiddleware(MiddlewareMixin):
         'otp_verify': settings.RATE_LIMITS.get('otp_verify', {'requests': 10, 'window': 300}),
         'login': settings.RATE_LIMITS.get('login', {'requests': 10, 'window': 300}),
         'register': settings.RATE_LIMITS.get('register', {'requests': 3, 'window': 3600}),
+        'register_bulk': settings.RATE_LIMITS.get('register_bulk', {'requests': 60, 'window': 3600}),
         'token_refresh': settings.RATE_LIMITS.get('token_refresh', {'requests': 20, 'window': 300}),
     }
 
@@ -105,7 +264,8 @@ class RateLimitMiddleware(MiddlewareMixin):
             if endpoint == 'otp_request':
                 email_key = self._get_rate_limit_key(request, 'otp_request', 'email')
                 email_config = config['email']
-                if self.limiter.is_rate_limited(email_key, email_config['requests'], email_config['window']):
+                if self.limiter.is_rate_limited(email_key, email_config['requests'], email_config['window'],
+                                                'otp_request_email'):
                     reset_time = self.limiter.get_reset_time(email_key, email_config['window'])
                     response_data, status_code = ErrorResponses.rate_limit_exceeded(
                         "Too many OTP requests for this email. Try again later.",
@@ -117,7 +277,7 @@ class RateLimitMiddleware(MiddlewareMixin):
                 # Check IP rate limit
                 ip_key = self._get_rate_limit_key(request, 'otp_request', 'ip')
                 ip_config = config['ip']
-                if self.limiter.is_rate_limited(ip_key, ip_config['requests'], ip_config['window']):
+                if self.limiter.is_rate_limited(ip_key, ip_config['requests'], ip_config['window'], 'otp_request_ip'):
                     reset_time = self.limiter.get_reset_time(ip_key, ip_config['window'])
                     response_data, status_code = ErrorResponses.rate_limit_exceeded(
                         "Too many OTP requests from this IP. Try again later.",
@@ -129,7 +289,7 @@ class RateLimitMiddleware(MiddlewareMixin):
             else:
 
                 key = self._get_rate_limit_key(request, endpoint)
-                if self.limiter.is_rate_limited(key, config['requests'], config['window']):
+                if self.limiter.is_rate_limited(key, config['requests'], config['window'], endpoint):
                     reset_time = self.limiter.get_reset_time(key, config['window'])
 
                     response_data, status_code = ErrorResponses.rate_limit_exceeded(
@@ -150,6 +310,8 @@ class RateLimitMiddleware(MiddlewareMixin):
             return 'otp_verify'
         elif '/login/' in path:
             return 'login'
+        elif '/register/bulk/' in path:
+            return 'register_bulk'
         elif '/register/' in path:
             return 'register'
         elif '/token/refresh/' in path:
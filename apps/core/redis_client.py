@@ -0,0 +1,184 @@
+"""
+Process-wide Redis client shared by the cache, rate limiter, OTP storage
+and recent-activity lists.
+
+The cache backend below hands out get_redis() instead of building its own
+client, so cache.get()/set() and direct Redis calls draw connections from the
+same bounded pools. Pools are created lazily, once per URL per process
+(redis-py resets them in a forked child), and sized and timed out from the
+REDIS_POOL_* / REDIS_SOCKET_* settings.
+
+REDIS_MODE selects the topology: 'single' (REDIS_URL), 'cluster' (Redis
+Cluster seeded from REDIS_URL) or 'sharded' (consistent hashing over the
+independent nodes in REDIS_SHARD_URLS). Per-email keys are hash-tagged (see
+apps.core.redis_keys) so they stay together in every mode.
+"""
+import threading
+from urllib.parse import urlsplit, urlunsplit
+import redis
+from django.conf import settings
+from django.core.cache.backends.redis import RedisCache as DjangoRedisCache, RedisCacheClient
+from redis.cluster import RedisCluster
+from redis.connection import BlockingConnectionPool
+from apps.core.redis_sharding import ShardedRedis
+
+# Cache OPTIONS that configure the Django client rather than the pool.
+_CLIENT_OPTIONS = ('pool_class', 'serializer', 'parser_class')
+
+_pools = {}
+_lock = threading.RLock()
+_client = None
+
+
+class SharedConnectionPool(BlockingConnectionPool):
+    """
+    Blocking pool that also counts the connections it created and how often a
+    caller had to wait for a free one, for sizing REDIS_POOL_MAX_CONNECTIONS.
+    """
+
+    def reset(self):
+        super().reset()
+        self.created = 0
+        self.waits = 0
+
+    def make_connection(self):
+        self.created += 1
+        return super().make_connection()
+
+    def get_connection(self, *args, **kwargs):
+        if self.pool.empty():
+            self.waits += 1
+        return super().get_connection(*args, **kwargs)
+
+    def stats(self):
+        idle = sum(1 for connection in list(self.pool.queue) if connection is not None)
+        return {
+            'max_connections': self.max_connections,
+            'created': self.created,
+            'in_use': len(self._connections) - idle,
+            'idle': idle,
+            'waits': self.waits,
+        }
+
+
+def _default_location():
+    config = settings.CACHES['default']
+    options = {
+        key: value for key, value in config.get('OPTIONS', {}).items()
+        if key not in _CLIENT_OPTIONS
+    }
+    return config['LOCATION'], options
+
+
+def _pool_options(options):
+    return {
+        'max_connections': settings.REDIS_POOL_MAX_CONNECTIONS,
+        'timeout': settings.REDIS_POOL_TIMEOUT,
+        'socket_timeout': settings.REDIS_SOCKET_TIMEOUT,
+        'socket_connect_timeout': settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        'health_check_interval': settings.REDIS_HEALTH_CHECK_INTERVAL,
+        **options,
+    }
+
+
+def get_connection_pool(url=None, **options):
+    """The process-wide pool for url (the cache's LOCATION by default)."""
+    if url is None:
+        url, options = _default_location()
+
+    with _lock:
+        pool = _pools.get(url)
+        if pool is None:
+            pool = _pools[url] = SharedConnectionPool.from_url(url, **_pool_options(options))
+        return pool
+
+
+def _create_client():
+    url, options = _default_location()
+
+    if settings.REDIS_MODE == 'cluster':
+        # Every node gets its own SharedConnectionPool; health checks are not
+        # accepted per node, the cluster client refreshes topology itself.
+        options = _pool_options(options)
+        options.pop('health_check_interval')
+        return RedisCluster.from_url(url, connection_pool_class=SharedConnectionPool, **options)
+
+    if settings.REDIS_MODE == 'sharded':
+        return ShardedRedis({
+            _without_credentials(shard_url): redis.Redis(connection_pool=get_connection_pool(shard_url, **options))
+            for shard_url in settings.REDIS_SHARD_URLS
+        })
+
+    return redis.Redis(connection_pool=get_connection_pool(url, **options))
+
+
+def get_redis():
+    """Shared client for the configured REDIS_MODE; cheap to call on every request."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = _create_client()
+    return _client
+
+
+class SharedRedisCacheClient(RedisCacheClient):
+    """
+    Django's client over get_redis(). The multi-key calls are adapted to the
+    topology: Django pipelines one MSET over all keys and reads them with one
+    MGET, both of which fail once the keys live on different nodes or slots.
+    """
+
+    def get_client(self, key=None, *, write=False):
+        return get_redis()
+
+    def get_many(self, keys):
+        client = self.get_client(None)
+        if isinstance(client, RedisCluster):
+            ret = client.mget_nonatomic(keys)
+        else:
+            ret = client.mget(keys)
+        return {
+            k: self._serializer.loads(v) for k, v in zip(keys, ret) if v is not None
+        }
+
+    def set_many(self, data, timeout):
+        client = self.get_client(None, write=True)
+        values = {k: self._serializer.dumps(v) for k, v in data.items()}
+        groups = client.split(values) if isinstance(client, ShardedRedis) else [(client, list(values))]
+
+        # One pipeline per node; a cluster pipeline routes each SET to its slot.
+        for node, keys in groups:
+            pipeline = node.pipeline(transaction=False)
+            for key in keys:
+                if timeout == 0:
+                    pipeline.delete(key)
+                else:
+                    pipeline.set(key, values[key], ex=timeout)
+            pipeline.execute()
+
+
+class RedisCache(DjangoRedisCache):
+    """Django's Redis cache backend over the shared client (and therefore REDIS_MODE)."""
+
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        self._class = SharedRedisCacheClient
+
+
+def _without_credentials(url):
+    parts = urlsplit(url)
+    netloc = parts.hostname or ''
+    if parts.port:
+        netloc = f'{netloc}:{parts.port}'
+    return urlunsplit(parts._replace(netloc=netloc))
+
+
+def pool_stats():
+    """Stats for each pool in this process, keyed by node with credentials stripped."""
+    pools = {_without_credentials(url): pool for url, pool in list(_pools.items())}
+    if isinstance(_client, RedisCluster):
+        for node in _client.get_nodes():
+            if node.redis_connection is not None:
+                pools[node.name] = node.redis_connection.connection_pool
+    return {name: pool.stats() for name, pool in pools.items()}
@@ -0,0 +1,51 @@
+"""
+Key schema for per-email Redis state.
+
+Every per-email key embeds the email as a hash tag (``{email}``). Redis
+Cluster hashes only the tag to pick a slot, and ShardedRedis does the same to
+pick a node, so all keys of one email live together and multi-key commands,
+pipelines and transactions over them keep working once the keyspace is
+spread across several nodes.
+"""
+
+
+def _tag(email):
+    return '{' + email + '}'
+
+
+def hash_tag(key):
+    """The part of key that selects its slot: the first non-empty {...} section, else the whole key."""
+    start = key.find('{')
+    if start != -1:
+        end = key.find('}', start + 1)
+        if end > start + 1:
+            return key[start + 1:end]
+    return key
+
+
+def otp_request_rate_key(email):
+    return f'ratelimit:otp_request:email:{_tag(email)}'
+
+
+def otp_key(email):
+    return f'otp:{_tag(email)}'
+
+
+def otp_failed_key(email):
+    return f'otp_failed:{_tag(email)}'
+
+
+def otp_lockout_key(email):
+    return f'otp_lockout:{_tag(email)}'
+
+
+def otp_email_sent_key(email, otp_hash):
+    return f'otp_email_sent:{_tag(email)}:{otp_hash}'
+
+
+def recent_activity_key(email):
+    return f'audit:recent:{_tag(email)}'
+
+
+def recent_activity_warming_key(email):
+    return f'audit:recent:warming:{_tag(email)}'
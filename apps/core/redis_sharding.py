@@ -0,0 +1,126 @@
+"""
+Client-side sharding over independent (non-cluster) Redis nodes.
+
+Keys are placed on a consistent-hash ring by their hash tag (see
+apps.core.redis_keys), so every key of one email lands on the same node and
+adding or removing a node only moves the keys of its ring segments. Single-key
+commands are forwarded to the owning node; the few multi-key commands the
+Django cache issues are split per node (set_many is split by the cache client
+itself, see apps.core.redis_client). Pipelines bind to the node of the first
+key they touch and refuse keys that live elsewhere.
+"""
+import bisect
+import hashlib
+from redis.exceptions import RedisError
+from apps.core.redis_keys import hash_tag
+
+
+def _ring_hash(value):
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], 'big')
+
+
+def _as_str(key):
+    return key.decode() if isinstance(key, bytes) else str(key)
+
+
+class ShardedRedis:
+    """Routes commands over {name: client} nodes by the hash tag of their first argument."""
+
+    points_per_node = 160
+
+    def __init__(self, nodes):
+        if not nodes:
+            raise ValueError('ShardedRedis needs at least one node')
+        self.nodes = dict(nodes)
+        ring = sorted(
+            (_ring_hash(f'{name}#{i}'), name)
+            for name in self.nodes for i in range(self.points_per_node)
+        )
+        self._points = [point for point, _ in ring]
+        self._names = [name for _, name in ring]
+
+    def node_name(self, key):
+        index = bisect.bisect(self._points, _ring_hash(hash_tag(_as_str(key))))
+        return self._names[index % len(self._names)]
+
+    def get_node(self, key):
+        return self.nodes[self.node_name(key)]
+
+    def __getattr__(self, name):
+        def command(key, *args, **kwargs):
+            return getattr(self.get_node(key), name)(key, *args, **kwargs)
+        return command
+
+    def split(self, keys):
+        """(node client, keys) pairs, keys grouped by the node that owns them."""
+        groups = {}
+        for key in keys:
+            groups.setdefault(self.node_name(key), []).append(key)
+        return [(self.nodes[name], group) for name, group in groups.items()]
+
+    def delete(self, *keys):
+        return sum(node.delete(*group) for node, group in self.split(keys))
+
+    def exists(self, *keys):
+        return sum(node.exists(*group) for node, group in self.split(keys))
+
+    def mget(self, keys, *args):
+        keys = list(keys) + list(args)
+        values = {}
+        for node, group in self.split(keys):
+            values.update(zip(group, node.mget(group)))
+        return [values[key] for key in keys]
+
+    def flushdb(self, **kwargs):
+        return all([node.flushdb(**kwargs) for node in self.nodes.values()])
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return ShardedPipeline(self, transaction)
+
+
+class ShardedPipeline:
+
+    def __init__(self, client, transaction):
+        self._client = client
+        self._transaction = transaction
+        self._node = None
+        self._pipeline = None
+
+    def _bind(self, key):
+        node = self._client.get_node(key)
+        if self._pipeline is None:
+            self._node = node
+            self._pipeline = node.pipeline(transaction=self._transaction)
+        elif node is not self._node:
+            raise RedisError(f'Key {key!r} is on another shard; pipelined keys must share a hash tag')
+        return self._pipeline
+
+    def __getattr__(self, name):
+        def command(key, *args, **kwargs):
+            return getattr(self._bind(key), name)(key, *args, **kwargs)
+        return command
+
+    def watch(self, *keys):
+        for key in keys:
+            self._bind(key)
+        return self._pipeline.watch(*keys)
+
+    def multi(self):
+        if self._pipeline is None:
+            raise RedisError('watch() a key before multi() on a sharded pipeline')
+        return self._pipeline.multi()
+
+    def execute(self, raise_on_error=True):
+        if self._pipeline is None:
+            return []
+        return self._pipeline.execute(raise_on_error)
+
+    def reset(self):
+        if self._pipeline is not None:
+            self._pipeline.reset()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.reset()
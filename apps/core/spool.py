@@ -0,0 +1,261 @@
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from django.conf import settings
+from apps.core.logger import audit_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: journals are still written, orphan recovery is skipped
+    fcntl = None
+
+
+class AuditSpool:
+    """
+    Non-blocking hand-off of audit events to Celery.
+
+    Requests only put events on a bounded in-memory queue; a background thread
+    publishes them. When the queue is full or the broker is failing, events are
+    appended to a local journal (fsync'd in batches) which is replayed once the
+    broker accepts messages again. Journals left behind by dead processes are
+    picked up too: every live process holds an flock on its own journal.
+
+    A disabled spool (enabled=False) discards submitted events and never
+    starts its thread.
+    """
+
+    def __init__(self, directory, max_queue_size=10000, fsync_interval=1.0,
+                 retry_interval=5.0, publish=None, enabled=True):
+        self.directory = str(directory)
+        self.enabled = enabled
+        self.max_queue_size = max_queue_size
+        self.fsync_interval = fsync_interval
+        self.retry_interval = retry_interval
+        self._publish_fn = publish
+
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._pid = None
+        self._journal = None
+        self._unsynced = False
+        self._broker_down_until = 0.0
+        self.counters = {'queued': 0, 'published': 0, 'spooled': 0, 'replayed': 0, 'dropped': 0}
+
+    def submit(self, event):
+        if not self.enabled:
+            return
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._spool([event])
+        else:
+            self._incr('queued')
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['broker_available'] = self.broker_available()
+        stats['journal_files'] = len(self._journal_files())
+        return stats
+
+    def broker_available(self):
+        return time.monotonic() >= self._broker_down_until
+
+    def process(self, event):
+        if not self.broker_available():
+            self._spool([event])
+            return
+
+        try:
+            self._publish(event)
+        except Exception as e:
+            self._mark_broker_down(e)
+            self._spool([event])
+        else:
+            self._incr('published')
+
+    def replay(self):
+        """Publish journaled events, including journals orphaned by dead processes."""
+        self._rotate_own_journal()
+
+        for path in self._journal_files():
+            if path == self._journal_path():
+                continue
+            if not self._replay_file(path):
+                return False
+        return True
+
+    def flush(self):
+        """Move everything still queued in memory to the journal and fsync it."""
+        events = []
+        while True:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if events:
+            self._spool(events)
+        self.fsync()
+
+    def fsync(self):
+        with self._lock:
+            if self._journal is not None and self._unsynced:
+                self._journal.flush()
+                os.fsync(self._journal.fileno())
+                self._unsynced = False
+
+    def _ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid != pid:
+                # Forked child: the parent's queue and journal belong to the parent.
+                self._queue = queue.Queue(maxsize=self.max_queue_size)
+                self._journal = None
+                self._pid = pid
+            self._thread = threading.Thread(target=self._run, name='audit-spool', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        last_fsync = last_replay = time.monotonic()
+        while True:
+            try:
+                event = self._queue.get(timeout=self.fsync_interval)
+            except queue.Empty:
+                event = None
+
+            try:
+                if event is not None:
+                    self.process(event)
+
+                now = time.monotonic()
+                if now - last_fsync >= self.fsync_interval:
+                    self.fsync()
+                    last_fsync = now
+
+                if now - last_replay >= self.retry_interval and self.broker_available():
+                    last_replay = now
+                    if self._journal_files():
+                        self.replay()
+            except Exception as e:
+                audit_logger.error(f"Audit spool worker error: {str(e)}")
+
+    def _publish(self, event):
+        if self._publish_fn is not None:
+            self._publish_fn(event)
+            return
+
+        from apps.core.tasks import write_audit_log
+        write_audit_log.delay(**event)
+
+    def _mark_broker_down(self, error):
+        if self.broker_available():
+            audit_logger.warning(f"Audit broker unavailable, spooling to journal: {str(error)}")
+        self._broker_down_until = time.monotonic() + self.retry_interval
+
+    def _incr(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def _journal_path(self):
+        return os.path.join(self.directory, f'audit-{os.getpid()}.jsonl')
+
+    def _journal_files(self):
+        return sorted(glob.glob(os.path.join(self.directory, 'audit-*.jsonl')))
+
+    def _spool(self, events):
+        with self._lock:
+            try:
+                if self._journal is None:
+                    os.makedirs(self.directory, exist_ok=True)
+                    self._journal = open(self._journal_path(), 'a', encoding='utf-8')
+                    if fcntl is not None:
+                        fcntl.flock(self._journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                for event in events:
+                    self._journal.write(json.dumps(event, default=str) + '\n')
+                self._journal.flush()
+                self._unsynced = True
+                self.counters['spooled'] += len(events)
+            except (OSError, TypeError, ValueError) as e:
+                self.counters['dropped'] += len(events)
+                audit_logger.error(f"Failed to spool {len(events)} audit events: {str(e)}")
+
+    def _rotate_own_journal(self):
+        with self._lock:
+            if self._journal is None:
+                return
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._journal.close()
+            self._journal = None
+            self._unsynced = False
+            path = self._journal_path()
+            os.replace(path, f'{path[:-len(".jsonl")]}.replay-{time.time_ns()}.jsonl')
+
+    def _replay_file(self, path):
+        try:
+            handle = open(path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return True
+
+        with handle:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return True  # Owned by a live process
+            if os.fstat(handle.fileno()).st_nlink == 0:
+                return True  # Replayed and removed by another process meanwhile
+
+            events = []
+            for line in handle:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    self._incr('dropped')
+
+            for index, event in enumerate(events):
+                try:
+                    self._publish(event)
+                except Exception as e:
+                    self._mark_broker_down(e)
+                    self._spool(events[index:])
+                    os.remove(path)
+                    return False
+                self._incr('replayed')
+
+            os.remove(path)
+        return True
+
+
+_audit_spool = None
+_audit_spool_lock = threading.Lock()
+
+
+def get_audit_spool():
+    global _audit_spool
+
+    if _audit_spool is None:
+        with _audit_spool_lock:
+            if _audit_spool is None:
+                _audit_spool = AuditSpool(
+                    settings.AUDIT_SPOOL_DIR,
+                    max_queue_size=settings.AUDIT_SPOOL_QUEUE_SIZE,
+                    fsync_interval=settings.AUDIT_SPOOL_FSYNC_INTERVAL,
+                    retry_interval=settings.AUDIT_SPOOL_RETRY_INTERVAL,
+                    enabled=settings.AUDIT_SPOOL_ENABLED,
+                )
+                atexit.register(_audit_spool.flush)
+    return _audit_spool
@@ -9,6 +9,7 @@ HTTP_400_BAD_REQUEST = drf_status.HTTP_400_BAD_REQUEST
 HTTP_401_UNAUTHORIZED = drf_status.HTTP_401_UNAUTHORIZED
 HTTP_403_FORBIDDEN = drf_status.HTTP_403_FORBIDDEN
 HTTP_404_NOT_FOUND = drf_status.HTTP_404_NOT_FOUND
+HTTP_412_PRECONDITION_FAILED = drf_status.HTTP_412_PRECONDITION_FAILED
 HTTP_423_LOCKED = 423 
 HTTP_429_TOO_MANY_REQUESTS = drf_status.HTTP_429_TOO_MANY_REQUESTS
 HTTP_500_INTERNAL_SERVER_ERROR = drf_status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -33,6 +34,8 @@ class ErrorCodes:
     INVALID_OTP_FORMAT = "INVALID_OTP_FORMAT"
     PASSWORDS_DO_NOT_MATCH = "PASSWORDS_DO_NOT_MATCH"
 
+    PRECONDITION_FAILED = "PRECONDITION_FAILED"
+
 
 class SuccessResponses:
     @staticmethod
@@ -217,6 +220,14 @@ class ErrorResponses:
             "message": message
         }, HTTP_403_FORBIDDEN
 
+    @staticmethod
+    def precondition_failed(message: str = "Resource has been modified since it was fetched"):
+        return {
+            "success": False,
+            "error": ErrorCodes.PRECONDITION_FAILED,
+            "message": message
+        }, HTTP_412_PRECONDITION_FAILED
+
     @staticmethod
     def server_error(message: str = "Internal server error"):
         return {
@@ -1,27 +1,58 @@
 
+import hashlib
 from celery import shared_task
-from django.core.mail import send_mail
+from celery.signals import worker_process_shutdown
 from django.conf import settings
+from django.core.cache import cache
+from apps.core import redis_keys
+from apps.core.mail import (
+    build_message, close_mail_connection, send_message, send_messages,
+)
 
 
-@shared_task
-def send_email_task(subject, message, recipient_list, from_email=None):
+@worker_process_shutdown.connect
+def close_worker_mail_connection(**kwargs):
+    close_mail_connection()
+
 
-    if from_email is None:
-        from_email = settings.DEFAULT_FROM_EMAIL
+@shared_task(ignore_result=True)
+def send_email_task(subject, message, recipient_list, from_email=None):
 
-    send_mail(
-        subject=subject,
-        message=message,
-        from_email=from_email,
-        recipient_list=recipient_list,
-        fail_silently=False,
-    )
+    send_message(build_message(subject, message, recipient_list, from_email))
     return f"Email sent to {recipient_list}"
 
 
-@shared_task
-def send_otp_email(email, otp):
+@shared_task(ignore_result=True)
+def send_bulk_email_task(messages):
+    """Send a list of {subject, message, recipient_list} dicts over one connection."""
+    sent = send_messages([build_message(**message) for message in messages])
+    return f"Bulk email sent: {sent} messages"
+
+
+@shared_task(ignore_result=True)
+def send_otp_email(email):
+    # Coalesce resend storms: only the OTP currently stored for the email is
+    # worth delivering. Older queued codes were replaced (or already verified).
+    otp = cache.get(redis_keys.otp_key(email))
+    if otp is None:
+        return f"OTP email to {email} skipped: expired or verified"
+
+    # Retries and redeliveries after a worker crash must not mail the same code twice.
+    otp_hash = hashlib.sha256(otp.encode()).hexdigest()
+    idempotency_key = redis_keys.otp_email_sent_key(email, otp_hash)
+    if not cache.add(idempotency_key, 1, timeout=settings.OTP_EXPIRY_SECONDS):
+        return f"OTP email to {email} skipped: already sent"
+
+    try:
+        _deliver_otp_email(email, otp)
+    except Exception:
+        cache.delete(idempotency_key)
+        raise
+
+    return f"OTP email sent to {email}"
+
+
+def _deliver_otp_email(email, otp):
     print(f"SENDING OTP EMAIL:")
     print(f"To: {email}")
     print(f"Subject: Your OTP Code")
@@ -29,21 +60,20 @@ def send_otp_email(email, otp):
     print(f"This code will expire in 5 minutes.")
     print("-" * 50)
 
-    return f"OTP email sent to {email}"
-
 
-@shared_task
+@shared_task(ignore_result=True)
 def write_audit_log(event, email, ip, meta):
 
     from apps.audit.models import AuditLog
 
     try:
-        AuditLog.objects.create(
+        meta = dict(meta or {})
+        AuditLog.objects.record(
             event=event,
             email=email,
-            ip_address=ip or '',
-            user_agent='',
-            metadata=meta or {}
+            ip_address=ip,
+            user_agent=meta.pop('user_agent', ''),
+            metadata=meta
         )
         print(f"AUDIT LOG: {event} - {email}")
         return f"Audit log written: {event}"
@@ -52,7 +82,7 @@ def write_audit_log(event, email, ip, meta):
         return f"Failed to write audit log: {e}"
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def log_system_event(event_type, message, metadata=None):
     print(f"System Event: {event_type} - {message}")
     if metadata:
@@ -61,7 +91,33 @@ def log_system_event(event_type, message, metadata=None):
     return f"Logged event: {event_type}"
 
 
-@shared_task
+@shared_task(ignore_result=True)
+def dispatch_outbox(max_batches=10):
+    from apps.core.outbox import dispatch_batch
+
+    dispatched = 0
+    for _ in range(max_batches):
+        claimed = dispatch_batch()
+        dispatched += claimed
+        if claimed < settings.OUTBOX_BATCH_SIZE:
+            break
+    return f"Outbox dispatched: {dispatched} messages"
+
+
+@shared_task(ignore_result=True)
+def archive_audit_logs():
+    from apps.audit.archive import archive_expired
+
+    segments, archived = archive_expired()
+    print(f"Archived {archived} audit logs into {segments} segments")
+    return f"Archived {archived} audit logs"
+
+
+@shared_task(ignore_result=True)
 def cleanup_expired_data():
+    from apps.core.outbox import purge_dispatched
+
     print("Running cleanup task...")
+    purged = purge_dispatched(settings.OUTBOX_RETENTION)
+    print(f"Purged {purged} dispatched outbox messages")
     return "Cleanup completed"
@@ -0,0 +1,19 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Disables the audit spool for the test run: its background thread would
+    commit audit rows outside each test's transaction. Tests that check the
+    audit events of a request patch apps.core.middleware.get_audit_spool.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._audit_spool_override = override_settings(AUDIT_SPOOL_ENABLED=False)
+        self._audit_spool_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._audit_spool_override.disable()
+        super().teardown_test_environment(**kwargs)
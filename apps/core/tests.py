@@ -1,3 +1,411 @@
-from django.test import TestCase
+import hashlib
+import shutil
+import smtplib
+import tempfile
+import redis
+from django.core import mail
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from unittest.mock import MagicMock, patch
+from redis.exceptions import ConnectionError as RedisConnectionError, RedisError
+from apps.core import mail as core_mail, outbox
+from apps.accounts.models import User
+from apps.audit.models import AuditLog
+from apps.core import db_router, redis_keys
+from apps.core.audit_policy import AuditPolicy
+from apps.core.circuit_breaker import CircuitBreaker
+from apps.core.middleware import DatabaseRoutingMiddleware
+from apps.core.models import OutboxMessage
+from apps.core.rate_limits import LocalRateLimiter, RedisRateLimiter
+from apps.core.redis_client import _default_location, get_redis, pool_stats
+from apps.core.redis_sharding import ShardedRedis
+from apps.core.spool import AuditSpool
+from apps.core.tasks import send_otp_email
 
-# Create your tests here.
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class MailConnectionTestCase(TestCase):
+
+    def setUp(self):
+        core_mail.close_mail_connection()
+
+    def tearDown(self):
+        core_mail.close_mail_connection()
+
+    def test_connection_is_reused(self):
+        """Test that consecutive sends share one connection."""
+        first = core_mail.get_mail_connection()
+        core_mail.send_message(core_mail.build_message('Hi', 'Body', ['a@example.com']))
+        self.assertIs(core_mail.get_mail_connection(), first)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_reconnects_after_failure(self):
+        """Test that a dropped connection is replaced and the message is sent once."""
+        stale = core_mail.get_mail_connection()
+        with patch.object(stale, 'send_messages', side_effect=smtplib.SMTPServerDisconnected):
+            sent = core_mail.send_message(core_mail.build_message('Hi', 'Body', ['a@example.com']))
+
+        self.assertEqual(sent, 1)
+        self.assertIsNot(core_mail.get_mail_connection(), stale)
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class OutboxDispatchTestCase(TestCase):
+
+    @patch('apps.core.tasks.send_bulk_email_task.delay')
+    def test_dispatch_marks_rows_dispatched(self, mock_bulk):
+        """Test that email rows are handed off as one bulk task and not claimed again."""
+        outbox.enqueue_email('Welcome', 'Body', ['a@example.com'])
+        outbox.enqueue_email('Welcome', 'Body', ['b@example.com'])
+
+        self.assertEqual(outbox.dispatch_batch(), 2)
+        mock_bulk.assert_called_once()
+        self.assertEqual(len(mock_bulk.call_args[0][0]), 2)
+        self.assertEqual(
+            OutboxMessage.objects.filter(status=OutboxMessage.STATUS_DISPATCHED).count(), 2
+        )
+        self.assertEqual(outbox.dispatch_batch(), 0)
+
+    @patch('apps.core.tasks.send_otp_email.apply_async', side_effect=ConnectionError('broker down'))
+    def test_failed_handoff_is_released_for_retry(self, mock_send):
+        """Test that a broker failure puts rows back to pending with a backoff."""
+        outbox.enqueue_otp_email('a@example.com')
+
+        outbox.dispatch_batch()
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.status, OutboxMessage.STATUS_PENDING)
+        self.assertEqual(message.attempts, 1)
+        self.assertEqual(outbox.dispatch_batch(), 0)
+
+    @patch('apps.core.tasks.send_bulk_email_task.delay')
+    @patch('apps.core.tasks.send_otp_email.apply_async')
+    def test_partial_failure_releases_only_unpublished_rows(self, mock_send, mock_bulk):
+        """Test that rows published before a failure are not released and sent again."""
+        outbox.enqueue_email('Welcome', 'Body', ['a@example.com'])
+        outbox.enqueue_otp_email('b@example.com')
+        outbox.enqueue_otp_email('c@example.com')
+        mock_send.side_effect = [None, ConnectionError('broker down')]
+
+        outbox.dispatch_batch()
+        self.assertEqual(
+            OutboxMessage.objects.get(kind=OutboxMessage.KIND_EMAIL).status, OutboxMessage.STATUS_DISPATCHED
+        )
+        self.assertEqual(
+            list(OutboxMessage.objects.filter(kind=OutboxMessage.KIND_OTP_EMAIL)
+                 .order_by('id').values_list('status', 'attempts')),
+            [(OutboxMessage.STATUS_DISPATCHED, 0), (OutboxMessage.STATUS_PENDING, 1)]
+        )
+
+    @patch('apps.core.tasks.send_otp_email.apply_async')
+    def test_expired_otp_is_dropped(self, mock_send):
+        """Test that an OTP email past its expiry is never published."""
+        outbox.enqueue_otp_email('a@example.com', expires_in=-1)
+
+        outbox.dispatch_batch()
+        mock_send.assert_not_called()
+        self.assertEqual(OutboxMessage.objects.get().status, OutboxMessage.STATUS_FAILED)
+
+    @patch('apps.core.tasks.send_otp_email.apply_async')
+    def test_older_otp_in_batch_is_coalesced(self, mock_send):
+        """Test that only the newest OTP per email in a batch is published."""
+        outbox.enqueue_otp_email('a@example.com')
+        outbox.enqueue_otp_email('a@example.com')
+
+        outbox.dispatch_batch()
+        mock_send.assert_called_once()
+        self.assertEqual(mock_send.call_args[0][0], ('a@example.com',))
+        self.assertEqual(
+            list(OutboxMessage.objects.order_by('id').values_list('status', flat=True)),
+            [OutboxMessage.STATUS_FAILED, OutboxMessage.STATUS_DISPATCHED]
+        )
+
+
+class OTPEmailIdempotencyTestCase(TestCase):
+
+    def setUp(self):
+        self.otp_key = redis_keys.otp_key('a@example.com')
+        keys = [self.otp_key] + [
+            redis_keys.otp_email_sent_key('a@example.com', hashlib.sha256(code).hexdigest())
+            for code in (b'123456', b'654321')
+        ]
+        cache.delete_many(keys)
+        self.addCleanup(cache.delete_many, keys)
+
+    @patch('apps.core.tasks._deliver_otp_email')
+    def test_duplicate_delivery_is_skipped(self, mock_deliver):
+        """Test that a redelivered task does not send the same code twice."""
+        cache.set(self.otp_key, '123456', timeout=300)
+
+        self.assertEqual(send_otp_email('a@example.com'), 'OTP email sent to a@example.com')
+        self.assertEqual(send_otp_email('a@example.com'), 'OTP email to a@example.com skipped: already sent')
+        mock_deliver.assert_called_once_with('a@example.com', '123456')
+
+    @patch('apps.core.tasks._deliver_otp_email')
+    def test_superseded_code_is_skipped(self, mock_deliver):
+        """Test that the sends queued by a resend storm mail only the current code, once."""
+        cache.set(self.otp_key, '123456', timeout=300)
+        cache.set(self.otp_key, '654321', timeout=300)
+
+        self.assertEqual(send_otp_email('a@example.com'), 'OTP email sent to a@example.com')
+        self.assertEqual(send_otp_email('a@example.com'), 'OTP email to a@example.com skipped: already sent')
+        mock_deliver.assert_called_once_with('a@example.com', '654321')
+
+
+class TaskRoutingTestCase(TestCase):
+
+    def test_otp_and_audit_tasks_use_separate_queues(self):
+        """Test that OTP delivery is routed away from the audit backlog."""
+        from tses_app.celery import app
+
+        router = app.amqp.router
+        otp_route = router.route({}, 'apps.core.tasks.send_otp_email')
+        audit_route = router.route({}, 'apps.core.tasks.write_audit_log')
+        self.assertEqual(otp_route['queue'].name, 'critical')
+        self.assertEqual(audit_route['queue'].name, 'audit')
+        self.assertLess(otp_route['priority'], audit_route['priority'])
+
+
+class RedisPoolTestCase(TestCase):
+
+    def test_cache_and_limiter_share_one_pool(self):
+        """Test that cache calls and get_redis() draw from the same process-wide pool."""
+        from apps.core.rate_limits import RedisRateLimiter
+
+        cache.set('pool-test', 1)
+        self.assertIs(RedisRateLimiter().redis, get_redis())
+        self.assertIs(cache._cache.get_client(write=True), get_redis())
+
+        stats = pool_stats()
+        self.assertEqual(len(stats), 1)
+        pool = next(iter(stats.values()))
+        self.assertGreaterEqual(pool['created'], 1)
+        self.assertEqual(pool['in_use'], 0)
+
+
+class ShardedRedisTestCase(TestCase):
+
+    def setUp(self):
+        self.nodes = {name: MagicMock(name=name) for name in ('a', 'b', 'c')}
+        self.client = ShardedRedis(self.nodes)
+
+    def test_per_email_keys_share_a_node(self):
+        """Test that every hash-tagged key of one email routes to the same node."""
+        for i in range(50):
+            email = f'user{i}@example.com'
+            keys = [
+                redis_keys.otp_key(email), redis_keys.otp_failed_key(email),
+                redis_keys.otp_lockout_key(email), redis_keys.otp_request_rate_key(email),
+                ':1:' + redis_keys.otp_email_sent_key(email, 'abc'), redis_keys.recent_activity_key(email),
+            ]
+            self.assertEqual(len({self.client.node_name(key) for key in keys}), 1)
+
+        self.assertEqual(len({self.client.node_name(f'{{user{i}}}') for i in range(50)}), 3)
+
+    def test_adding_a_node_moves_a_fraction_of_keys(self):
+        keys = [redis_keys.otp_key(f'user{i}@example.com') for i in range(1000)]
+        grown = ShardedRedis({**self.nodes, 'd': MagicMock()})
+
+        moved = sum(self.client.node_name(key) != grown.node_name(key) for key in keys)
+        self.assertLess(moved, 400)
+
+    def test_pipeline_refuses_keys_on_other_nodes(self):
+        email_key = redis_keys.otp_failed_key('a@example.com')
+        other = next(f'{{k{i}}}' for i in range(100)
+                     if self.client.node_name(f'{{k{i}}}') != self.client.node_name(email_key))
+
+        pipe = self.client.pipeline()
+        pipe.incr(email_key)
+        pipe.expire(redis_keys.otp_lockout_key('a@example.com'), 10)
+        with self.assertRaises(RedisError):
+            pipe.incr(other)
+
+
+class ShardedCacheTestCase(TestCase):
+    """The Django cache API over two real nodes: DB 1 and 2 of the configured Redis."""
+
+    def setUp(self):
+        location, options = _default_location()
+        base = location.rsplit('/', 1)[0]
+        self.client = ShardedRedis({
+            f'db{db}': redis.Redis(connection_pool=redis.ConnectionPool.from_url(f'{base}/{db}', **options))
+            for db in (1, 2)
+        })
+        patcher = patch('apps.core.redis_client._client', self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.data = {f'sharded-{i}': i for i in range(20)}
+        self.addCleanup(cache.delete_many, list(self.data))
+        self.assertEqual(len({self.client.node_name(cache.make_key(key)) for key in self.data}), 2)
+
+    def test_multi_key_calls_span_nodes(self):
+        cache.set_many(self.data, timeout=60)
+
+        self.assertEqual(cache.get_many(list(self.data) + ['missing']), self.data)
+        self.assertEqual(cache.get('sharded-3'), 3)
+        key = cache.make_key('sharded-3')
+        self.assertTrue(0 < self.client.get_node(key).ttl(key) <= 60)
+
+        cache.delete_many(list(self.data))
+        self.assertEqual(cache.get_many(list(self.data)), {})
+
+    def test_set_many_with_zero_timeout_deletes(self):
+        cache.set_many(self.data)
+        cache.set_many(self.data, timeout=0)
+        self.assertEqual(cache.get_many(list(self.data)), {})
+
+
+class RateLimiterCircuitBreakerTestCase(TestCase):
+
+    def setUp(self):
+        self.redis = MagicMock()
+        self.redis.zremrangebyscore.side_effect = RedisConnectionError('timed out')
+        self.breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=60)
+        self.limiter = RedisRateLimiter(self.redis, self.breaker, LocalRateLimiter(self.breaker))
+
+    def test_opens_after_failures_and_limits_locally(self):
+        """Test that Redis errors trip the breaker and the local window still enforces the limit."""
+        results = [self.limiter.is_rate_limited('k', 3, 60) for _ in range(5)]
+
+        self.assertEqual(results, [False, False, False, True, True])
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertEqual(self.redis.zremrangebyscore.call_count, 2)
+        self.assertEqual(self.breaker.stats()['opened'], 1)
+
+    @override_settings(RATE_LIMIT_FAIL_CLOSED={'login'})
+    def test_fail_closed_policy_rejects(self):
+        self.assertTrue(self.limiter.is_rate_limited('k', 3, 60, 'login'))
+        self.assertFalse(self.limiter.is_rate_limited('k', 3, 60, 'token_refresh'))
+
+    def test_half_open_trial_closes_breaker(self):
+        self.breaker.reset_timeout = 0
+        self.limiter.is_rate_limited('k', 3, 60)
+        self.limiter.is_rate_limited('k', 3, 60)
+        self.assertEqual(self.breaker.state, 'open')
+
+        self.redis.zremrangebyscore.side_effect = None
+        self.redis.zcard.return_value = 0
+        self.assertFalse(self.limiter.is_rate_limited('k', 3, 60))
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertEqual(self.breaker.stats()['half_opened'], 1)
+
+    def test_unrelated_error_releases_half_open_trial(self):
+        """Test that a trial call failing with a non-Redis error does not block every later trial."""
+        self.breaker.reset_timeout = 0
+        self.limiter.is_rate_limited('k', 3, 60)
+        self.limiter.is_rate_limited('k', 3, 60)
+
+        self.redis.zremrangebyscore.side_effect = TypeError('bad argument')
+        with self.assertRaises(TypeError):
+            self.limiter.is_rate_limited('k', 3, 60)
+        self.assertEqual(self.breaker.state, 'half_open')
+
+        self.redis.zremrangebyscore.side_effect = None
+        self.redis.zcard.return_value = 0
+        self.assertFalse(self.limiter.is_rate_limited('k', 3, 60))
+        self.assertEqual(self.breaker.state, 'closed')
+
+
+class AuditSpoolTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.published = []
+        self.broker_up = True
+        self.spool = AuditSpool(self.directory, max_queue_size=1, publish=self._publish)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _publish(self, event):
+        if not self.broker_up:
+            raise ConnectionError('broker down')
+        self.published.append(event)
+
+    def test_broker_outage_spools_and_replays(self):
+        """Test that events published during an outage are journaled and replayed in order."""
+        self.broker_up = False
+        self.spool.process({'event': 'A'})
+        self.spool.process({'event': 'B'})
+        self.assertEqual(self.spool.stats()['spooled'], 2)
+
+        self.broker_up = True
+        self.spool._broker_down_until = 0
+        self.assertTrue(self.spool.replay())
+        self.assertEqual([e['event'] for e in self.published], ['A', 'B'])
+        self.assertEqual(self.spool.stats()['replayed'], 2)
+        self.assertEqual(self.spool.stats()['journal_files'], 0)
+
+    def test_full_queue_overflows_to_journal(self):
+        """Test that submit never blocks when the in-memory queue is full."""
+        with patch.object(self.spool, '_ensure_started'):
+            self.spool.submit({'event': 'A'})
+            self.spool.submit({'event': 'B'})
+
+        stats = self.spool.stats()
+        self.assertEqual(stats['queued'], 1)
+        self.assertEqual(stats['spooled'], 1)
+
+
+class AuditPolicyTestCase(TestCase):
+
+    def setUp(self):
+        self.policy = AuditPolicy([
+            {'path': '/static/', 'action': 'skip'},
+            {'path': '/api/', 'statuses': (400, 599), 'action': 'record'},
+            {'path': '/admin/', 'statuses': (400, 599), 'action': 'record'},
+            {'path': '/admin/', 'methods': ['GET'], 'action': 'sample', 'rate': 0.25},
+            {'path': '/admin/', 'action': 'record'},
+        ])
+
+    def test_first_matching_rule_wins(self):
+        """Test that rules are evaluated in order and unmatched paths are skipped."""
+        self.assertEqual(self.policy.sample_rate('GET', '/static/admin/base.css', 404), 0.0)
+        self.assertEqual(self.policy.sample_rate('GET', '/admin/users/', 500), 1.0)
+        self.assertEqual(self.policy.sample_rate('GET', '/admin/users/', 200), 0.25)
+        self.assertEqual(self.policy.sample_rate('POST', '/admin/users/', 302), 1.0)
+        self.assertEqual(self.policy.sample_rate('GET', '/api/v1/other/', 200), 0.0)
+        self.assertEqual(self.policy.sample_rate('GET', '/api/v1/other/', 400), 1.0)
+        self.assertEqual(self.policy.sample_rate('GET', '/wp-login.php', 404), 0.0)
+
+    def test_invalid_action_is_rejected(self):
+        with self.assertRaises(ValueError):
+            AuditPolicy([{'path': '/', 'action': 'maybe'}])
+
+
+@patch('apps.core.db_router.replica_configured', return_value=True)
+class DatabaseRoutingTestCase(TestCase):
+
+    def setUp(self):
+        self.router = db_router.PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def test_reads_use_replica_until_a_write(self, mock_configured):
+        state, token = db_router.begin_request()
+        try:
+            self.assertEqual(self.router.db_for_read(AuditLog), 'default')
+
+            state.use_replica = True
+            self.assertEqual(self.router.db_for_read(AuditLog), 'replica')
+            self.assertEqual(self.router.db_for_read(User), 'replica')
+
+            self.assertEqual(self.router.db_for_write(User), 'default')
+            self.assertEqual(self.router.db_for_read(AuditLog), 'default')
+        finally:
+            db_router.end_request(token)
+
+    def test_write_pins_client_to_primary(self, mock_configured):
+        """Test that a request that wrote sets a pin honoured by the next request."""
+        def write_view(request):
+            self.router.db_for_write(User)
+            return HttpResponse()
+
+        request = self.factory.post('/api/v1/auth/profile/')
+        response = DatabaseRoutingMiddleware(write_view)(request)
+        cookie = response.cookies[db_router.PIN_COOKIE]
+
+        follow_up = self.factory.get('/api/v1/audit/logs/')
+        self.assertFalse(db_router.is_pinned(follow_up))
+        follow_up.COOKIES[db_router.PIN_COOKIE] = cookie.value
+        self.assertTrue(db_router.is_pinned(follow_up))
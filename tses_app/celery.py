@@ -13,10 +13,18 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
 
 app.conf.beat_schedule = {
+    'dispatch-outbox': {
+        'task': 'apps.core.tasks.dispatch_outbox',
+        'schedule': float(os.getenv('OUTBOX_DISPATCH_INTERVAL', '2')),
+    },
     'cleanup-expired-data': {
         'task': 'apps.core.tasks.cleanup_expired_data',
         'schedule': crontab(hour=2, minute=0),  # Run daily at 2 AM
     },
+    'archive-audit-logs': {
+        'task': 'apps.core.tasks.archive_audit_logs',
+        'schedule': crontab(hour=3, minute=0),
+    },
 }
 
 @app.task(bind=True)
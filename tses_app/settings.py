@@ -23,6 +23,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'django_filters',
@@ -43,6 +44,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     # Custom middleware
     'apps.core.middleware.RequestLoggingMiddleware',
+    'apps.core.middleware.DatabaseRoutingMiddleware',
     'apps.core.middleware.AuditLogMiddleware',
     'apps.core.rate_limits.RateLimitMiddleware',
 ]
@@ -66,11 +68,14 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'tses_app.wsgi.application'
 
+TEST_RUNNER = 'apps.core.test_runner.TestRunner'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
 import os
+from kombu import Queue
 
 DATABASES = {
     'default': {
@@ -83,6 +88,21 @@ DATABASES = {
     }
 }
 
+# Optional read replica. List/detail views opt in to replica reads; writes
+# always go to default, and a client that wrote reads from default for
+# DB_REPLICA_PIN_SECONDS afterwards. Pointing DB_REPLICA_HOST at the primary
+# exercises the routing locally against the same data.
+if os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.getenv('DB_REPLICA_HOST'),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['apps.core.db_router.PrimaryReplicaRouter']
+DB_REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', '5'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -134,9 +154,22 @@ AUTH_USER_MODEL = 'accounts.User'
 
 # Redis Configuration
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+# One client per process shared by the cache, rate limiter, OTP storage and
+# recent-activity lists (apps.core.redis_client). Callers block up to REDIS_POOL_TIMEOUT
+# seconds for a free connection once REDIS_POOL_MAX_CONNECTIONS (per node)
+# are in use.
+# REDIS_MODE: 'single', 'cluster' (Redis Cluster seeded from REDIS_URL) or
+# 'sharded' (consistent hashing over the standalone nodes in REDIS_SHARD_URLS).
+REDIS_MODE = os.getenv('REDIS_MODE', 'single')
+REDIS_SHARD_URLS = [url.strip() for url in os.getenv('REDIS_SHARD_URLS', '').split(',') if url.strip()]
+REDIS_POOL_MAX_CONNECTIONS = int(os.getenv('REDIS_POOL_MAX_CONNECTIONS', '50'))
+REDIS_POOL_TIMEOUT = float(os.getenv('REDIS_POOL_TIMEOUT', '2'))
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '1'))
+REDIS_SOCKET_CONNECT_TIMEOUT = float(os.getenv('REDIS_SOCKET_CONNECT_TIMEOUT', '1'))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv('REDIS_HEALTH_CHECK_INTERVAL', '30'))
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'BACKEND': 'apps.core.redis_client.RedisCache',
         'LOCATION': REDIS_URL,
     }
 }
@@ -148,6 +181,45 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Kombu and the result backend keep their own pools; give them the same limits.
+CELERY_BROKER_POOL_LIMIT = REDIS_POOL_MAX_CONNECTIONS
+CELERY_REDIS_MAX_CONNECTIONS = REDIS_POOL_MAX_CONNECTIONS
+CELERY_REDIS_SOCKET_TIMEOUT = REDIS_SOCKET_TIMEOUT
+CELERY_REDIS_SOCKET_CONNECT_TIMEOUT = REDIS_SOCKET_CONNECT_TIMEOUT
+CELERY_REDIS_BACKEND_HEALTH_CHECK_INTERVAL = REDIS_HEALTH_CHECK_INTERVAL
+
+# Task routing: latency-critical OTP delivery never queues behind audit writes.
+# Run one worker pool per queue group (see docker-compose.yml).
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_QUEUES = (
+    Queue('critical'),
+    Queue('email'),
+    Queue('audit'),
+    Queue('default'),
+    Queue('maintenance'),
+)
+CELERY_TASK_ROUTES = {
+    'apps.core.tasks.send_otp_email': {'queue': 'critical', 'priority': 0},
+    'apps.core.tasks.dispatch_outbox': {'queue': 'critical', 'priority': 1},
+    'apps.core.tasks.send_email_task': {'queue': 'email'},
+    'apps.core.tasks.send_bulk_email_task': {'queue': 'email'},
+    'apps.core.tasks.write_audit_log': {'queue': 'audit', 'priority': 9},
+    'apps.core.tasks.log_system_event': {'queue': 'audit', 'priority': 9},
+    'apps.core.tasks.cleanup_expired_data': {'queue': 'maintenance'},
+    'apps.core.tasks.archive_audit_logs': {'queue': 'maintenance'},
+}
+CELERY_TASK_DEFAULT_PRIORITY = 5
+# Redis emulates priorities with per-priority lists (0 is highest) and, with
+# the 'priority' strategy, drains queues in the order given to `worker -Q`.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+    'socket_timeout': REDIS_SOCKET_TIMEOUT,
+    'socket_connect_timeout': REDIS_SOCKET_CONNECT_TIMEOUT,
+    'health_check_interval': REDIS_HEALTH_CHECK_INTERVAL,
+}
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 
 # Email Configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -157,6 +229,15 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@tsesapp.com')
+EMAIL_TIMEOUT = int(os.getenv('EMAIL_TIMEOUT', '10'))
+EMAIL_CONNECTION_MAX_AGE = int(os.getenv('EMAIL_CONNECTION_MAX_AGE', '300'))  # Recycle worker SMTP connections
+
+# Transactional outbox
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '100'))
+OUTBOX_CLAIM_LEASE = 60          # Seconds before a claimed, undispatched row can be re-claimed
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_DISPATCH_INTERVAL = float(os.getenv('OUTBOX_DISPATCH_INTERVAL', '2'))
+OUTBOX_RETENTION = 86400         # Keep dispatched rows for a day
 
 # JWT Configuration
 REST_FRAMEWORK = {
@@ -246,5 +327,67 @@ RATE_LIMITS = {
     'otp_verify': {'requests': 10, 'window': 300},        
     'login': {'requests': 10, 'window': 300},            
     'register': {'requests': 3, 'window': 3600},          
+    'register_bulk': {'requests': 60, 'window': 3600},     # Staff/partner batches, separate from sign-ups
     'token_refresh': {'requests': 20, 'window': 300},      
 }
+# When Redis fails RATE_LIMIT_BREAKER_FAILURES times in a row the limiter stops
+# calling it for RATE_LIMIT_BREAKER_RESET_SECONDS and enforces the limits
+# above per process instead. Policies (RATE_LIMITS keys) listed in
+# RATE_LIMIT_FAIL_CLOSED reject every request while Redis is unavailable.
+RATE_LIMIT_BREAKER_FAILURES = int(os.getenv('RATE_LIMIT_BREAKER_FAILURES', '5'))
+RATE_LIMIT_BREAKER_RESET_SECONDS = float(os.getenv('RATE_LIMIT_BREAKER_RESET_SECONDS', '30'))
+RATE_LIMIT_FAIL_CLOSED = {
+    policy.strip() for policy in os.getenv('RATE_LIMIT_FAIL_CLOSED', '').split(',') if policy.strip()
+}
+
+# Audit policy for AuditLogMiddleware: first matching rule wins, unmatched
+# requests are not audited. Views that record an explicit event always get
+# exactly one (merged) record regardless of these rules.
+AUDIT_POLICY = [
+    {'path': '/static/', 'action': 'skip'},
+    {'path': '/admin/jsi18n/', 'action': 'skip'},
+    {'path': '/api/schema/', 'action': 'skip'},
+    # Errors only under our own prefixes: 404s from scanners probing
+    # arbitrary paths are not worth a row each.
+    {'path': '/api/', 'statuses': (400, 599), 'action': 'record'},
+    {'path': '/admin/', 'statuses': (400, 599), 'action': 'record'},
+    {'path': '/api/v1/audit/', 'methods': ['GET', 'HEAD', 'OPTIONS'], 'action': 'sample', 'rate': 0.01},
+    {'path': '/admin/', 'methods': ['GET', 'HEAD'], 'action': 'sample', 'rate': 0.1},
+    {'path': '/api/v1/auth/', 'methods': ['GET', 'HEAD', 'OPTIONS'], 'action': 'sample', 'rate': 0.1},
+    {'path': '/api/v1/auth/', 'action': 'record'},
+    {'path': '/admin/', 'action': 'record'},
+]
+
+AUDIT_INTERN_CACHE_SIZE = 10000  # Event names / user agents whose lookup ids are cached per process
+
+# Metadata values included in the audit full-text search document
+AUDIT_SEARCH_METADATA_KEYS = ['request', 'referer', 'status_code']
+
+# Per-email capped list of the latest audit events, served by /audit/recent/
+AUDIT_RECENT_ACTIVITY_SIZE = 50
+AUDIT_RECENT_ACTIVITY_TTL = 7 * 24 * 3600
+
+# Audit log detail responses are immutable once written, but rows are archived
+# (and their ids 404) after AUDIT_ARCHIVE_AFTER_DAYS, so clients keep them briefly.
+AUDIT_DETAIL_MAX_AGE = 86400          # Cache-Control max-age for clients
+AUDIT_DETAIL_CACHE_TIMEOUT = 3600     # Server-side cache of serialized payloads
+
+# Cold storage for aged-out audit logs (see apps/audit/archive.py). Required
+# for archiving: archived rows are deleted, so this must be persistent storage.
+AUDIT_ARCHIVE_DIR = os.getenv('AUDIT_ARCHIVE_DIR')
+AUDIT_ARCHIVE_AFTER_DAYS = int(os.getenv('AUDIT_ARCHIVE_AFTER_DAYS', '90'))
+AUDIT_ARCHIVE_BLOCK_SIZE = 1000  # Records per independently compressed block
+
+# Local spool for audit events while the broker is slow or unavailable
+AUDIT_SPOOL_DIR = os.getenv('AUDIT_SPOOL_DIR', str(BASE_DIR / 'var' / 'audit_spool'))
+AUDIT_SPOOL_QUEUE_SIZE = 10000
+AUDIT_SPOOL_FSYNC_INTERVAL = 1.0   # Seconds between journal fsyncs
+AUDIT_SPOOL_RETRY_INTERVAL = 5.0   # Seconds between broker recovery probes
+# Turned off for test runs by apps.core.test_runner.TestRunner
+AUDIT_SPOOL_ENABLED = os.getenv('AUDIT_SPOOL_ENABLED', 'True').lower() == 'true'
+
+OTP_EXPIRY_SECONDS = 300  # OTP codes (and undelivered OTP emails) expire after 5 minutes
+
+# Batch registration (POST /api/v1/auth/register/bulk/)
+BULK_REGISTER_MAX_USERS = 500
+BULK_REGISTER_HASH_WORKERS = int(os.getenv('BULK_REGISTER_HASH_WORKERS', '4'))  # Threads hashing passwords